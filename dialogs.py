@@ -68,6 +68,8 @@ class ClassManagementDialog(QDialog):
         # 在__init__中定义所有实例属性
         self.class_names: List[str] = []
         self.class_colors: List[tuple[int, int, int]] = []
+        # 调色板缓存 {标签数量: 颜色列表}，避免每次增删标签都重新生成整个调色板
+        self._palette_cache: dict[int, List[tuple[int, int, int]]] = {}
 
         self.setWindowTitle("标签管理")
         self.setGeometry(200, 200, 500, 300)
@@ -154,14 +156,31 @@ class ClassManagementDialog(QDialog):
             color_layout.addStretch()
             self.class_table.setCellWidget(i, 2, color_widget)
 
+    def _get_palette(self, count: int) -> List[tuple[int, int, int]]:
+        """获取指定数量的调色板，带缓存
+
+        同一会话内反复增删标签时，相同数量的调色板直接复用缓存结果，
+        既避免了O(N)的HSV重新采样，也保证颜色分配在会话内保持稳定。
+
+        Args:
+            count: 需要的颜色数量
+
+        Returns:
+            颜色列表，每个颜色为(r, g, b)元组
+        """
+        palette = self._palette_cache.get(count)
+        if palette is None:
+            palette = generate_distinct_colors(count)
+            self._palette_cache[count] = palette
+        return list(palette)
+
     def add_class(self) -> None:
         """添加新标签，自动生成颜色"""
         class_name, ok = QInputDialog.getText(self, "添加标签", "请输入标签名称:")
         if ok and class_name and class_name not in self.class_names:
             self.class_names.append(class_name)
-            # 生成新的颜色
-            new_colors = generate_distinct_colors(len(self.class_names))
-            self.class_colors = new_colors
+            # 使用缓存的调色板，避免重新生成全部颜色
+            self.class_colors = self._get_palette(len(self.class_names))
             self.update_table()
             logger.info(f"添加新标签: {class_name}")
         elif class_name in self.class_names:
@@ -218,8 +237,7 @@ class ClassManagementDialog(QDialog):
             if reply == QMessageBox.StandardButton.Yes:
                 del self.class_names[current_row]
                 del self.class_colors[current_row]
-                # 重新生成所有颜色，确保视觉差异
-                self.class_colors = generate_distinct_colors(len(self.class_names))
+                # 保留其余标签已有的颜色，不再整体重新生成
                 self.update_table()
                 logger.info(f"删除标签: {class_name}")
         else:
@@ -227,7 +245,9 @@ class ClassManagementDialog(QDialog):
 
     def auto_generate_colors(self) -> None:
         """为所有标签自动生成颜色"""
+        # 用户显式要求重新生成时跳过缓存，并用新结果更新缓存
         self.class_colors = generate_distinct_colors(len(self.class_names))
+        self._palette_cache[len(self.class_names)] = list(self.class_colors)
         self.update_table()
         logger.info("为所有标签自动生成了新颜色")
 
@@ -1,9 +1,9 @@
 import logging
 from typing import List, Dict, Optional, Tuple, Any
 
-import cv2
-from PySide6.QtCore import (Qt, QRect, QPoint, Signal)
-from PySide6.QtGui import (QPixmap, QImage, QPainter, QPen, QColor, QFont)
+import numpy as np
+from PySide6.QtCore import (Qt, QRect, QPoint, Signal, QTimer)
+from PySide6.QtGui import (QPixmap, QImage, QPainter, QPen, QColor, QFont, QFontMetrics)
 from PySide6.QtWidgets import (QLabel, QMessageBox, QMenu, QInputDialog)
 
 from utils import generate_distinct_colors
@@ -12,6 +12,48 @@ from utils import generate_distinct_colors
 logger = logging.getLogger(__name__)
 
 
+def _normalize_box(x1, y1, x2, y2, img_width, img_height):
+    """把框坐标钳制到图像范围内并规范化
+
+    保证左上角坐标小于右下角坐标，且宽高不为0（收缩到0时向内或向外
+    扩一个像素）。独立成模块级纯数值函数，避免在每个鼠标样本的热路径
+    中重复内联这十余个分支。
+
+    Args:
+        x1, y1, x2, y2: 框坐标
+        img_width: 图像宽度
+        img_height: 图像高度
+
+    Returns:
+        规范化后的(x1, y1, x2, y2)
+    """
+    # 保证坐标在有效范围内
+    x1 = max(0, min(x1, img_width))
+    y1 = max(0, min(y1, img_height))
+    x2 = max(0, min(x2, img_width))
+    y2 = max(0, min(y2, img_height))
+
+    # 保证左上角坐标小于右下角坐标
+    if x1 > x2:
+        x1, x2 = x2, x1
+    if y1 > y2:
+        y1, y2 = y2, y1
+
+    # 保证框的最小宽高为1（贴边时向内扩，避免越界）
+    if x2 - x1 < 1:
+        if x2 >= img_width:
+            x1 = x2 - 1
+        else:
+            x2 = x1 + 1
+    if y2 - y1 < 1:
+        if y2 >= img_height:
+            y1 = y2 - 1
+        else:
+            y2 = y1 + 1
+
+    return x1, y1, x2, y2
+
+
 
 class ImageEditor(QLabel):
     """图片编辑器，用于显示图片和编辑标注框，支持彩色标签"""
@@ -23,7 +65,13 @@ class ImageEditor(QLabel):
         # 在__init__中定义所有实例属性
         self.image: Optional[Any] = None
         self.q_image: Optional[QImage] = None
+        # QImage引用的底层像素数组，生命周期必须覆盖q_image
+        self._image_buffer: Optional[np.ndarray] = None
         self.annotations: List[Dict] = []
+        # 标注框坐标的(N,4)数组镜像，供绘制和命中检测做向量化计算
+        self._boxes_np: Optional[np.ndarray] = None
+        # 标注数量镜像，热路径上的范围检查省去len()和属性链查找
+        self._annot_count: int = 0
         self.class_names: List[str] = []
         self.class_colors: List[Tuple[int, int, int]] = []
         self.current_box_idx: int = -1
@@ -31,13 +79,60 @@ class ImageEditor(QLabel):
         self.drag_handle: Optional[str] = None  # None, 'top_left', 'top_right', 'bottom_left', 'bottom_right', 'center'
         self.last_pos = QPoint()
         self.box_offset = QPoint()
+        # 拖拽期间不变的几何参数 (偏移x, 偏移y, 缩放x, 缩放y, 逆缩放x, 逆缩放y)，
+        # 按下时计算一次，窗口尺寸变化或拖拽结束时失效
+        self._drag_ctx: Optional[Tuple[float, float, float, float, float, float]] = None
         
         # 添加一个标志，表示是否在拖拽过程中
         self.during_drag_operation: bool = False
         
         # 缓存颜色字典，提高查找性能
         self._color_cache: Dict[str, Tuple[int, int, int]] = {}
+        # 由颜色派生的QColor对象和亮度值，随set_class_info一起重建，
+        # 避免绘制循环中反复构造QColor和重算亮度
+        self._class_qcolor_cache: Dict[str, QColor] = {}
+        self._luminance_cache: Dict[str, float] = {}
+        # 标签名称到类别ID的映射，代替list.index的线性查找
+        self._class_name_to_id: Dict[str, int] = {}
+        # 每个标签的画笔缓存 {标签: (普通画笔, 高亮画笔, 高亮颜色元组)}
+        self._pen_cache: Dict[str, Tuple[QPen, QPen, Tuple[int, int, int]]] = {}
+
+        # 绘制用的共享Qt对象，构造一次反复使用
+        self._bold_font = QFont()
+        self._bold_font.setBold(True)
+        self._bold_font.setPointSize(10)
+        self._handle_pen = QPen(QColor(255, 255, 0), 2)
+        self._handle_brush = QColor(255, 255, 255)
+
+        # 缓存预渲染的标签贴图，避免每帧重复测量和绘制文本
+        self._label_sprite_cache: Dict[Tuple[str, int, int, int], QPixmap] = {}
         
+        # 原始尺寸的pixmap及平滑缩放结果缓存 {(宽, 高): QPixmap}
+        self._source_pixmap: Optional[QPixmap] = None
+        self._smooth_cache: Dict[Tuple[int, int], QPixmap] = {}
+        # 拖动窗口尺寸时先用快速缩放即时反馈，停止后再补一次平滑缩放
+        self._smooth_timer = QTimer(self)
+        self._smooth_timer.setSingleShot(True)
+        self._smooth_timer.setInterval(150)
+        self._smooth_timer.timeout.connect(self._apply_smooth_pixmap)
+
+        # 拖拽重绘合并定时器：鼠标采样率可达100Hz以上，把重绘压到约60fps
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(16)
+        self.update_timer.timeout.connect(self._flush_pending_update)
+        # 合并期间累积的脏区域；为None时表示需要整体重绘
+        self._pending_dirty: Optional[QRect] = None
+        # 合并期间记录的最新鼠标位置，到期后只处理最后一个采样
+        self._pending_move: Optional[QPoint] = None
+
+        # annotation_updated信号合并定时器：连续的快速编辑（拖拽结束、
+        # 批量删除/改标签）只触发一次下游的保存和界面刷新
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setInterval(50)
+        self._emit_timer.timeout.connect(self._emit_annotation_updated)
+
         # 添加窗口关闭标志
         self.closing: bool = False
 
@@ -51,26 +146,39 @@ class ImageEditor(QLabel):
     @property
     def current_annotation(self):
         """获取当前选中的标注框"""
-        if 0 <= self.current_box_idx < len(self.annotations):
+        if 0 <= self.current_box_idx < self._annot_count:
             return self.annotations[self.current_box_idx]
         return None
 
     @property
     def has_selection(self):
         """检查是否有选中的标注框"""
-        return 0 <= self.current_box_idx < len(self.annotations)
+        return 0 <= self.current_box_idx < self._annot_count
 
     @property
     def has_annotations(self):
         """检查是否有标注"""
-        return len(self.annotations) > 0
+        return self._annot_count > 0
+
+    def flush_annotation_update(self) -> None:
+        """立即发出仍在合并窗口内的标注变更信号
+
+        合并定时器挂起期间若直接替换标注列表（切换图片），该次编辑
+        会静默丢失，因此set_image/set_annotations在替换前先冲刷。
+        """
+        if self._emit_timer.isActive():
+            self._emit_timer.stop()
+            self._emit_annotation_updated()
 
     def set_image(self, image):
         """设置显示的图片"""
+        # 先冲刷挂起的标注变更，再替换内容
+        self.flush_annotation_update()
         self.image = image
         self.update_q_image()
         self.annotations = []
         self.current_box_idx = -1
+        self._sync_boxes_np()
         self.update()
 
     def update_q_image(self):
@@ -80,19 +188,91 @@ class ImageEditor(QLabel):
             return
 
         height, width, channel = self.image.shape
-        bytes_per_line = 3 * width
-        rgb_image = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
-        self.q_image = QImage(rgb_image.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-        # 修正Qt.KeepAspectRatio和Qt.SmoothTransformation的引用
-        self.setPixmap(QPixmap.fromImage(self.q_image).scaled(
-            self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        # Format_BGR888让QImage直接引用OpenCV的BGR内存，省去整幅图的
+        # 颜色空间转换拷贝；QImage不持有数据，必须保留对底层数组的引用
+        self._image_buffer = np.ascontiguousarray(self.image)
+        self.q_image = QImage(self._image_buffer.data, width, height,
+                              self._image_buffer.strides[0], QImage.Format.Format_BGR888)
+        # 原始pixmap只转换一次，缩放统一走_rescale_pixmap
+        self._source_pixmap = QPixmap.fromImage(self.q_image)
+        self._smooth_cache.clear()
+        self._rescale_pixmap(fast=False)
+
+    def _rescale_pixmap(self, fast: bool) -> None:
+        """按当前控件尺寸重建显示的pixmap
+
+        fast=True时用快速（最近邻）缩放立即反馈，并启动定时器在停止缩放后
+        补一次平滑缩放；fast=False时直接平滑缩放，结果按(宽, 高)缓存，
+        反复切换到相同尺寸时无需重新插值。
+
+        Args:
+            fast: 是否使用快速缩放
+        """
+        if self._source_pixmap is None:
+            return
+
+        key = (self.width(), self.height())
+        if fast:
+            # 该尺寸若已有平滑结果，直接复用，连快速缩放都可以省掉
+            cached = self._smooth_cache.get(key)
+            if cached is not None:
+                self.setPixmap(cached)
+                return
+            self.setPixmap(self._source_pixmap.scaled(
+                self.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation))
+            self._smooth_timer.start()
+            return
+
+        pixmap = self._smooth_cache.get(key)
+        if pixmap is None:
+            pixmap = self._source_pixmap.scaled(
+                self.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation)
+            # 缓存只需覆盖最近几个窗口尺寸
+            if len(self._smooth_cache) > 8:
+                self._smooth_cache.clear()
+            self._smooth_cache[key] = pixmap
+        self.setPixmap(pixmap)
+
+    def _apply_smooth_pixmap(self) -> None:
+        """缩放停止后的延迟平滑渲染"""
+        if not self.closing:
+            self._rescale_pixmap(fast=False)
 
     def set_annotations(self, annotations):
-        """设置标注信息"""
-        self.annotations = annotations.copy()
+        """设置标注信息，在入口处一次性过滤无效条目
+
+        绘制和命中检测的热路径依赖"每个标注都是含box/class的字典"这一
+        不变量，在这里统一校验后，热循环内不再需要逐帧的类型检查。
+        """
+        # 替换列表前先冲刷挂起的标注变更，避免编辑丢失
+        self.flush_annotation_update()
+        valid = []
+        for annot in annotations:
+            if isinstance(annot, dict) and "box" in annot and "class" in annot:
+                valid.append(annot)
+            else:
+                logger.warning(f"忽略无效的标注数据: {annot}")
+        self.annotations = valid
         self.current_box_idx = -1
+        self._sync_boxes_np()
         self.update()
 
+    def _sync_boxes_np(self) -> None:
+        """重建标注框坐标的NumPy镜像数组
+
+        数组行号与annotations下标一一对应，缺少box字段的无效标注填零，
+        绘制时会照常跳过。
+        """
+        n = len(self.annotations)
+        arr = np.zeros((n, 4), dtype=np.float32)
+        for i, annot in enumerate(self.annotations):
+            if isinstance(annot, dict) and "box" in annot:
+                arr[i] = annot["box"]
+        self._boxes_np = arr
+        self._annot_count = n
+
     def set_class_info(self, class_names: List[str], class_colors: List[Tuple[int, int, int]]) -> None:
         """设置标签列表和对应的颜色"""
         self.class_names = class_names.copy()
@@ -102,8 +282,28 @@ class ImageEditor(QLabel):
         else:
             self.class_colors = class_colors.copy()
         
-        # 重新构建颜色缓存
+        # 重新构建颜色缓存及其派生缓存
         self._color_cache = dict(zip(self.class_names, self.class_colors))
+        self._class_qcolor_cache = {
+            name: QColor(r, g, b) for name, (r, g, b) in self._color_cache.items()}
+        self._class_name_to_id = {name: i for i, name in enumerate(self.class_names)}
+
+        # 高亮色和亮度对全部标签一次广播算完，再展开成查找字典
+        self._pen_cache = {}
+        if self.class_names:
+            colors_np = np.array(self.class_colors, dtype=np.float32)
+            brightened = np.minimum(255.0, colors_np * 1.2).astype(np.int32)
+            luminance = colors_np @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            self._luminance_cache = {
+                name: float(lum) for name, lum in zip(self.class_names, luminance)}
+            for name, (r, g, b), bright in zip(self.class_names, self.class_colors, brightened):
+                bright_t = (int(bright[0]), int(bright[1]), int(bright[2]))
+                self._pen_cache[name] = (
+                    QPen(self._class_qcolor_cache[name], 2),
+                    QPen(QColor(*bright_t), 2),
+                    bright_t)
+        else:
+            self._luminance_cache = {}
         logger.debug(f"已更新标签信息：{len(self.class_names)}个标签")
 
     # 移除不再需要的class_color_cache属性，直接使用_color_cache
@@ -114,17 +314,75 @@ class ImageEditor(QLabel):
         if class_name in self._color_cache:
             return self._color_cache[class_name]
         
-        try:
-            idx = self.class_names.index(class_name)
+        idx = self._class_name_to_id.get(class_name)
+        if idx is not None:
             color = self.class_colors[idx]
-            # 更新缓存
-            self._color_cache[class_name] = color
-            return color
-        except ValueError:
-            # 对于未知标签，使用默认绿色并缓存
-            default_color = (0, 255, 0)
-            self._color_cache[class_name] = default_color
-            return default_color
+        else:
+            # 对于未知标签，使用默认绿色
+            color = (0, 255, 0)
+        # 更新缓存
+        self._color_cache[class_name] = color
+        return color
+
+    def _build_pens(self, class_name: str) -> Tuple[QPen, QPen, Tuple[int, int, int]]:
+        """构建并缓存某个标签的普通/高亮画笔
+
+        未知标签（不在当前标签列表中的旧标注）也会经由此处按默认颜色补建，
+        因此绘制循环里永远只需一次字典查找。
+
+        Args:
+            class_name: 标签名称
+
+        Returns:
+            (普通画笔, 高亮画笔, 高亮颜色元组)
+        """
+        r, g, b = self.get_class_color(class_name)
+        bright = (min(255, int(r * 1.2)), min(255, int(g * 1.2)), min(255, int(b * 1.2)))
+        pens = (QPen(QColor(r, g, b), 2), QPen(QColor(*bright), 2), bright)
+        self._pen_cache[class_name] = pens
+        return pens
+
+    def _get_label_sprite(self, text: str, r: int, g: int, b: int) -> QPixmap:
+        """获取标签文本的预渲染贴图，带缓存
+
+        同一个类别标签（含置信度文本）在多帧之间重复出现，预渲染成QPixmap后
+        每帧只需一次drawPixmap，省去重复的文本测量、背景填充和文字光栅化。
+
+        Args:
+            text: 标签文本
+            r: 背景颜色红色分量
+            g: 背景颜色绿色分量
+            b: 背景颜色蓝色分量
+
+        Returns:
+            渲染好的标签贴图
+        """
+        key = (text, r, g, b)
+        sprite = self._label_sprite_cache.get(key)
+        if sprite is not None:
+            return sprite
+
+        font = self._bold_font
+        metrics = QFontMetrics(font)
+        width = metrics.horizontalAdvance(text) + 4
+        height = metrics.height()
+
+        sprite = QPixmap(width, height)
+        sprite.fill(QColor(r, g, b))
+        sprite_painter = QPainter(sprite)
+        sprite_painter.setFont(font)
+        # 根据背景亮度自动选择文字颜色
+        luminance = (r * 0.299 + g * 0.587 + b * 0.114)
+        text_color = QColor(0, 0, 0) if luminance > 127 else QColor(255, 255, 255)
+        sprite_painter.setPen(text_color)
+        sprite_painter.drawText(sprite.rect(), Qt.AlignmentFlag.AlignCenter, text)
+        sprite_painter.end()
+
+        # 限制缓存大小，防止长会话中无限增长
+        if len(self._label_sprite_cache) > 256:
+            self._label_sprite_cache.clear()
+        self._label_sprite_cache[key] = sprite
+        return sprite
 
     def paintEvent(self, event):
         # 在窗口关闭时避免绘制
@@ -137,8 +395,9 @@ class ImageEditor(QLabel):
         """绘制事件，用于显示图片和带颜色的标注框"""
         super().paintEvent(event)
             
+        # 矩形和标签贴图都是轴对齐绘制，走整数光栅快速路径即可，
+        # 抗锯齿只在绘制圆形控制点前开启
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
 
         # 计算缩放比例
         pixmap = self.pixmap()
@@ -162,100 +421,99 @@ class ImageEditor(QLabel):
 
         # 绘制所有标注框，使用各自标签的颜色
         if self.annotations:
+            # 把热循环中反复访问的方法和属性绑定为局部变量，
+            # 减少每个标注框的CPython属性查找开销
+            set_pen = painter.setPen
+            draw_pixmap = painter.drawPixmap
+            pen_cache_get = self._pen_cache.get
+            # _build_pens会把颜色写入_color_cache，画笔存在即保证颜色已缓存，
+            # 这里直接绑定字典查找，省去方法调用和未命中分支
+            color_cache_get = self._color_cache.get
+            current_idx = self.current_box_idx
+
+            # 一次向量化计算所有框的屏幕坐标，代替循环内的逐框标量乘加
+            if self._boxes_np is None or len(self._boxes_np) != len(self.annotations):
+                self._sync_boxes_np()
+            scaled_int = (
+                self._boxes_np * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+                + np.array([pixmap_x, pixmap_y, pixmap_x, pixmap_y], dtype=np.float32)
+            ).astype(np.int32)
+
+            # 局部重绘时跳过脏区域之外的框；向外扩展以覆盖框线宽和上方的标签贴图
+            clip = event.rect().adjusted(-2, -22, 2, 2)
+            # 标注在set_annotations入口处已校验，热循环内不再做类型检查。
+            # 第一遍按标签归类矩形并收集标签贴图，第二遍每个标签只设置
+            # 一次画笔就用drawRects批量提交，减少绘图状态切换和后端调用
+            rects_by_class: Dict[str, List[QRect]] = {}
+            sprite_jobs: List[Tuple[int, int, QPixmap]] = []
+            selected_job = None
             for i, annot in enumerate(self.annotations):
-                try:
-                    # 检查标注数据的有效性
-                    if not isinstance(annot, dict) or "box" not in annot or "class" not in annot:
-                        logger.warning(f"无效的标注数据: {annot}")
-                        continue
-                        
-                    x1, y1, x2, y2 = annot["box"]
-                    x1_scaled = x1 * scale_x + pixmap_x
-                    y1_scaled = y1 * scale_y + pixmap_y
-                    x2_scaled = x2 * scale_x + pixmap_x
-                    y2_scaled = y2 * scale_y + pixmap_y
-
-                    # 获取该标签的颜色，使用优化的缓存
-                    class_name = annot["class"]
-                    r, g, b = self.get_class_color(class_name)
-                    
-                    # 选中的框使用稍微亮一点的颜色
-                    if i == self.current_box_idx:
-                        r = min(255, int(r * 1.2))
-                        g = min(255, int(g * 1.2))
-                        b = min(255, int(b * 1.2))
-
-                    color = QColor(r, g, b)
-                    pen = QPen(color, 2)
-                    painter.setPen(pen)
-                    rect = QRect(int(x1_scaled), int(y1_scaled),
+                x1_scaled, y1_scaled, x2_scaled, y2_scaled = scaled_int[i]
+
+                box_rect = QRect(int(x1_scaled), int(y1_scaled),
                                  int(x2_scaled - x1_scaled), int(y2_scaled - y1_scaled))
-                    painter.drawRect(rect)
-
-                    # 绘制类别标签，背景使用标签颜色
-                    font = QFont()
-                    font.setBold(True)
-                    font.setPointSize(10)
-                    painter.setFont(font)
-                    # 使用QFontMetrics来准确计算文本宽度
-                    font_metrics = painter.fontMetrics()
-                    
-                    # 安全地处理confidence字段
-                    if "confidence" in annot:
-                        text = f"{annot['class']} ({annot['confidence']:.2f})"
-                    else:
-                        text = annot['class']
-                        
-                    text_width = font_metrics.horizontalAdvance(text)
-                    text_height = font_metrics.height()
-                    
-                    # 确保文本框不会超出控件范围
-                    text_x = max(0, int(x1_scaled))
-                    text_y = max(0, int(y1_scaled) - text_height)
-                    text_rect = QRect(text_x, text_y, text_width + 4, text_height)
-                    painter.fillRect(text_rect, color)
-                    
-                    # 根据背景亮度自动选择文字颜色
-                    luminance = (r * 0.299 + g * 0.587 + b * 0.114)
-                    text_color = QColor(0, 0, 0) if luminance > 127 else QColor(255, 255, 255)
-                    painter.setPen(text_color)
-                    painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, text)
-                except Exception as e:
-                    logger.error(f"绘制标注时出错: {str(e)}")
+                # 与脏区域不相交的框不需要任何绘制调用
+                if not clip.intersects(box_rect):
                     continue
 
-        # 如果有选中的框，绘制控制点
-        try:
-            if 0 <= self.current_box_idx < len(self.annotations):
-                annot = self.annotations[self.current_box_idx]
-                # 检查标注数据的有效性
-                if isinstance(annot, dict) and "box" in annot:
-                    x1, y1, x2, y2 = annot["box"]
-                    x1_scaled = x1 * scale_x + pixmap_x
-                    y1_scaled = y1 * scale_y + pixmap_y
-                    x2_scaled = x2 * scale_x + pixmap_x
-                    y2_scaled = y2 * scale_y + pixmap_y
-
-                    # 绘制四个角的控制点，使用黄色
-                    control_size = 8
-                    points = [
-                        (x1_scaled, y1_scaled),  # top-left
-                        (x2_scaled, y1_scaled),  # top-right
-                        (x1_scaled, y2_scaled),  # bottom-left
-                        (x2_scaled, y2_scaled)  # bottom-right
-                    ]
-
-                    painter.setPen(QPen(QColor(255, 255, 0), 2))
-                    painter.setBrush(QColor(255, 255, 255))
-                    for (x, y) in points:
-                        # 确保坐标有效
-                        try:
-                            painter.drawEllipse(int(x - control_size / 2), int(y - control_size / 2),
-                                                control_size, control_size)
-                        except Exception:
-                            logger.warning(f"绘制控制点失败: ({x}, {y})")
-        except Exception as e:
-            logger.error(f"绘制控制点时出错: {str(e)}")
+                class_name = annot["class"]
+                pens = pen_cache_get(class_name)
+                if pens is None:
+                    pens = self._build_pens(class_name)
+                if i == current_idx:
+                    # 选中的框使用稍微亮一点的高亮画笔，单独绘制
+                    selected_job = (pens[1], box_rect)
+                    r, g, b = pens[2]
+                else:
+                    rects = rects_by_class.get(class_name)
+                    if rects is None:
+                        rects_by_class[class_name] = [box_rect]
+                    else:
+                        rects.append(box_rect)
+                    r, g, b = color_cache_get(class_name, (0, 255, 0))
+
+                # 绘制类别标签，使用预渲染的标签贴图
+                # 安全地处理confidence字段
+                if "confidence" in annot:
+                    text = f"{annot['class']} ({annot['confidence']:.2f})"
+                else:
+                    text = annot['class']
+
+                sprite = self._get_label_sprite(text, r, g, b)
+
+                # 确保文本框不会超出控件范围
+                sprite_jobs.append((max(0, int(x1_scaled)),
+                                    max(0, int(y1_scaled) - sprite.height()),
+                                    sprite))
+
+            for class_name, rects in rects_by_class.items():
+                set_pen(self._pen_cache[class_name][0])
+                painter.drawRects(rects)
+            if selected_job is not None:
+                set_pen(selected_job[0])
+                painter.drawRect(selected_job[1])
+            for text_x, text_y, sprite in sprite_jobs:
+                draw_pixmap(text_x, text_y, sprite)
+
+        # 如果有选中的框，绘制控制点；屏幕坐标直接复用上面批量算好的结果
+        if 0 <= self.current_box_idx < self._annot_count:
+            x1_scaled, y1_scaled, x2_scaled, y2_scaled = scaled_int[self.current_box_idx]
+
+            # 绘制四个角的控制点，使用黄色
+            control_size = 8
+            points = [
+                (x1_scaled, y1_scaled),  # top-left
+                (x2_scaled, y1_scaled),  # top-right
+                (x1_scaled, y2_scaled),  # bottom-left
+                (x2_scaled, y2_scaled)  # bottom-right
+            ]
+
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+            painter.setPen(self._handle_pen)
+            painter.setBrush(self._handle_brush)
+            for (x, y) in points:
+                painter.drawEllipse(int(x - control_size / 2), int(y - control_size / 2),
+                                    control_size, control_size)
 
     def mousePressEvent(self, event):
         """鼠标按下事件，用于选择和拖动标注框"""
@@ -281,68 +539,79 @@ class ImageEditor(QLabel):
         self.current_box_idx = -1
         self.drag_handle = None
 
-        for i, annot in enumerate(self.annotations):
-            x1, y1, x2, y2 = annot["box"]
-            x1_scaled = x1 * scale_x + pixmap_x
-            y1_scaled = y1 * scale_y + pixmap_y
-            x2_scaled = x2 * scale_x + pixmap_x
-            y2_scaled = y2 * scale_y + pixmap_y
-
-            # 检查是否点击了控制点
-            control_size = 10
-            handles = [
-                (x1_scaled, y1_scaled, 'top_left'),
-                (x2_scaled, y1_scaled, 'top_right'),
-                (x1_scaled, y2_scaled, 'bottom_left'),
-                (x2_scaled, y2_scaled, 'bottom_right')
-            ]
-
-            for (hx, hy, handle) in handles:
-                if (abs(pos.x() - hx) <= control_size and
-                        abs(pos.y() - hy) <= control_size):
-                    self.current_box_idx = i
-                    self.drag_handle = handle
-                    self.last_pos = pos
-                    self.dragging = True
-                    self.update()
-                    return None
-
-            # 检查是否点击了框内部
-            if (x1_scaled <= pos.x() <= x2_scaled and
-                    y1_scaled <= pos.y() <= y2_scaled):
-                self.current_box_idx = i
+        # 向量化命中检测：一次计算所有框的控制点命中和内部命中掩码，
+        # 代替逐框逐控制点的Python比较循环
+        if self._boxes_np is None or len(self._boxes_np) != len(self.annotations):
+            self._sync_boxes_np()
+
+        control_size = 10
+        px, py = pos.x(), pos.y()
+        scaled = (self._boxes_np
+                  * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+                  + np.array([pixmap_x, pixmap_y, pixmap_x, pixmap_y], dtype=np.float32))
+
+        # 四个角控制点坐标，形状(N, 4, 2)，顺序与drag_handle名称对应
+        corners = np.stack([
+            scaled[:, [0, 1]], scaled[:, [2, 1]],
+            scaled[:, [0, 3]], scaled[:, [2, 3]]], axis=1)
+        handle_hits = np.abs(corners - np.array([px, py], dtype=np.float32)).max(axis=2) <= control_size
+        handle_any = handle_hits.any(axis=1)
+        inside = ((scaled[:, 0] <= px) & (px <= scaled[:, 2]) &
+                  (scaled[:, 1] <= py) & (py <= scaled[:, 3]))
+
+        # 与原逐框扫描语义一致：命中下标最小的框，框内控制点优先
+        hit_indices = np.flatnonzero(handle_any | inside)
+        if len(hit_indices) > 0:
+            i = int(hit_indices[0])
+            self.current_box_idx = i
+            self.last_pos = pos
+            self.dragging = True
+            # 几何参数在整个拖拽过程中不变，后续mouseMoveEvent直接复用
+            self._drag_ctx = (pixmap_x, pixmap_y, scale_x, scale_y,
+                              inv_scale_x, inv_scale_y)
+            if handle_any[i]:
+                handle_names = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+                self.drag_handle = handle_names[int(np.argmax(handle_hits[i]))]
+            else:
                 self.drag_handle = 'center'
-                self.last_pos = pos
-                self.box_offset = QPoint(
-                    int(pos.x() - x1_scaled),
-                    int(pos.y() - y1_scaled)
-                )
-                self.dragging = True
-                self.update()
-                return None
+                self.box_offset = QPoint(int(px - scaled[i, 0]), int(py - scaled[i, 1]))
+            self.update()
+            return None
 
         super().mousePressEvent(event)
         return None
 
     def mouseMoveEvent(self, event):
         """鼠标移动事件，用于拖动标注框"""
-        if not self.dragging or self.current_box_idx < 0 or self.current_box_idx >= len(self.annotations):
+        if not self.dragging or self.current_box_idx < 0 or self.current_box_idx >= self._annot_count:
             return super().mouseMoveEvent(event)
 
-        pos = event.pos()
-        pixmap = self.pixmap()
-        if pixmap.isNull():
-            return None
-
-        # 计算图片在 QLabel 中的偏移量（居中显示时的偏移）
-        pixmap_x = (self.width() - pixmap.width()) // 2
-        pixmap_y = (self.height() - pixmap.height()) // 2
+        # 只记录最新位置，坐标换算和重绘由合并定时器按帧率执行；
+        # 高回报率鼠标的中间采样在这里被自然丢弃
+        self._pending_move = event.pos()
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+        return None
 
-        # 计算缩放比例
-        scale_x = pixmap.width() / self.image.shape[1]
-        scale_y = pixmap.height() / self.image.shape[0]
-        inv_scale_x = 1 / scale_x
-        inv_scale_y = 1 / scale_y
+    def _process_drag_move(self, pos):
+        """按最新的鼠标位置更新被拖拽的标注框
+
+        Args:
+            pos: 最新的鼠标位置
+        """
+        # 优先复用按下时缓存的几何参数；窗口尺寸中途变化时重新计算
+        ctx = self._drag_ctx
+        if ctx is None:
+            pixmap = self.pixmap()
+            if pixmap.isNull():
+                return None
+            pixmap_x = (self.width() - pixmap.width()) // 2
+            pixmap_y = (self.height() - pixmap.height()) // 2
+            scale_x = pixmap.width() / self.image.shape[1]
+            scale_y = pixmap.height() / self.image.shape[0]
+            ctx = self._drag_ctx = (pixmap_x, pixmap_y, scale_x, scale_y,
+                                    1 / scale_x, 1 / scale_y)
+        pixmap_x, pixmap_y, scale_x, scale_y, inv_scale_x, inv_scale_y = ctx
 
         annot = self.annotations[self.current_box_idx]
         x1, y1, x2, y2 = annot["box"]
@@ -386,42 +655,23 @@ class ImageEditor(QLabel):
             new_y2 = (pos.y() - pixmap_y) * inv_scale_y
 
         # 确保坐标有效且在图像范围内
-        img_width = self.image.shape[1]
-        img_height = self.image.shape[0]
-        
-        # 保证坐标在有效范围内
-        new_x1 = max(0, min(new_x1, img_width))
-        new_y1 = max(0, min(new_y1, img_height))
-        new_x2 = max(0, min(new_x2, img_width))
-        new_y2 = max(0, min(new_y2, img_height))
-        
-        # 保证左上角坐标小于右下角坐标
-        if new_x1 > new_x2:
-            new_x1, new_x2 = new_x2, new_x1
-        if new_y1 > new_y2:
-            new_y1, new_y2 = new_y2, new_y1
-            
-        # 避免框的宽高为0
-        if new_x1 == new_x2:
-            if new_x1 > 0:
-                new_x1 -= 1
-            else:
-                new_x2 += 1
-        if new_y1 == new_y2:
-            if new_y1 > 0:
-                new_y1 -= 1
-            else:
-                new_y2 += 1
+        img_h, img_w = self.image.shape[:2]
+        new_x1, new_y1, new_x2, new_y2 = _normalize_box(
+            new_x1, new_y1, new_x2, new_y2, img_w, img_h)
 
-        # 更新标注框
+        # 更新标注框，并同步坐标镜像数组中的对应行
         self.annotations[self.current_box_idx]["box"] = (new_x1, new_y1, new_x2, new_y2)
+        if self._boxes_np is not None and self.current_box_idx < len(self._boxes_np):
+            self._boxes_np[self.current_box_idx] = (new_x1, new_y1, new_x2, new_y2)
         self.last_pos = pos
         
         # 标记正在进行拖拽操作
         self.during_drag_operation = True
-        
-        # 只更新界面，不发送信号
-        self.update()
+
+        # 只更新界面，不发送信号；只对旧框+新框的并集区域做局部失效，
+        # 并通过定时器合并连续的鼠标样本
+        self.update_annotation_area(x1, y1, x2, y2, new_x1, new_y1, new_x2, new_y2,
+                                    scale_x, scale_y, pixmap_x, pixmap_y)
         return None
 
     def update_annotation_area(self, old_x1, old_y1, old_x2, old_y2, new_x1, new_y1, new_x2, new_y2, scale_x, scale_y, pixmap_x, pixmap_y):
@@ -437,39 +687,74 @@ class ImageEditor(QLabel):
         new_x2_scaled = new_x2 * scale_x + pixmap_x
         new_y2_scaled = new_y2 * scale_y + pixmap_y
         
-        # 计算需要更新的区域（包括旧框和新框）
-        update_x1 = int(min(old_x1_scaled, new_x1_scaled) - 10)
-        update_y1 = int(min(old_y1_scaled, new_y1_scaled) - 10)
-        update_x2 = int(max(old_x2_scaled, new_x2_scaled) + 10)
-        update_y2 = int(max(old_y2_scaled, new_y2_scaled) + 10)
-        
-        # 更新指定区域
-        self.update(update_x1, update_y1, update_x2 - update_x1, update_y2 - update_y1)
+        # 计算需要更新的区域（包括旧框和新框），向外留出控制点的半径，
+        # 上方额外留出标签贴图的高度，避免拖拽时残留旧标签
+        update_x1 = int(min(old_x1_scaled, new_x1_scaled) - 12)
+        update_y1 = int(min(old_y1_scaled, new_y1_scaled) - 30)
+        update_x2 = int(max(old_x2_scaled, new_x2_scaled) + 12)
+        update_y2 = int(max(old_y2_scaled, new_y2_scaled) + 12)
+
+        # 累积到待重绘脏区域，由合并定时器统一触发局部重绘
+        dirty = QRect(update_x1, update_y1, update_x2 - update_x1, update_y2 - update_y1)
+        if self._pending_dirty is not None:
+            self._pending_dirty = self._pending_dirty.united(dirty)
+        else:
+            self._pending_dirty = dirty
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def _flush_pending_update(self):
+        """合并定时器到期后处理最新拖拽位置并执行累积的局部重绘"""
+        pos = self._pending_move
+        self._pending_move = None
+        if pos is not None and self.dragging:
+            self._process_drag_move(pos)
+
+        dirty = self._pending_dirty
+        self._pending_dirty = None
+        # 本次已消费全部待处理状态，避免拖拽处理重新启动定时器造成空转
+        self.update_timer.stop()
+        if dirty is not None:
+            self.update(dirty)
+        elif pos is None:
+            self.update()
+
+    def _emit_annotation_updated(self):
+        """合并窗口结束后真正发出annotation_updated信号"""
+        if not self.closing:
+            self.annotation_updated.emit(self.annotations)
 
     def mouseReleaseEvent(self, event):
         """鼠标释放事件"""
+        # 先消费尚未处理的最后一个拖拽位置，避免丢失释放前的移动
+        if self.dragging and self._pending_move is not None:
+            pos = self._pending_move
+            self._pending_move = None
+            self._process_drag_move(pos)
         self.dragging = False
-        
+        self._drag_ctx = None
+
         # 拖拽结束，发送更新信号并重置标志
         if self.during_drag_operation:
             self.during_drag_operation = False
-            self.annotation_updated.emit(self.annotations)
-            
+            self._emit_timer.start()
+
         super().mouseReleaseEvent(event)
 
     def resizeEvent(self, event):
         """窗口大小改变事件"""
+        # 窗口尺寸变化使缓存的拖拽几何参数失效
+        self._drag_ctx = None
         if self.q_image:
-            # 修正Qt.KeepAspectRatio和Qt.SmoothTransformation的引用
-            self.setPixmap(QPixmap.fromImage(self.q_image).scaled(
-                self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+            # 先快速缩放保证拖动过程流畅，停止后由定时器补平滑缩放
+            self._rescale_pixmap(fast=True)
         super().resizeEvent(event)
         # 触发重绘以确保标注框正确显示
         self.update()
 
     def contextMenuEvent(self, event):
         """右键菜单事件，用于删除标注框或修改标签"""
-        if self.current_box_idx < 0 or self.current_box_idx >= len(self.annotations):
+        if self.current_box_idx < 0 or self.current_box_idx >= self._annot_count:
             return super().contextMenuEvent(event)
 
         # 创建上下文菜单
@@ -498,20 +783,21 @@ class ImageEditor(QLabel):
         # 从项目标签列表中选择
         label, ok = QInputDialog.getItem(
             self, "修改标签", "请选择标签:",
-            self.class_names, self.class_names.index(current_label) if current_label in self.class_names else 0,
+            self.class_names, self._class_name_to_id.get(current_label, 0),
             False)
 
         if ok and label:
             self.annotations[self.current_box_idx]["class"] = label
             # 更新类别ID
-            if label in self.class_names:
-                self.annotations[self.current_box_idx]["class_id"] = self.class_names.index(label)
+            if label in self._class_name_to_id:
+                self.annotations[self.current_box_idx]["class_id"] = self._class_name_to_id[label]
             self.update()
-            self.annotation_updated.emit(self.annotations)
+            self._emit_timer.start()
 
     def delete_annotation(self):
         """删除标注"""
         del self.annotations[self.current_box_idx]
         self.current_box_idx = -1
+        self._sync_boxes_np()
         self.update()
-        self.annotation_updated.emit(self.annotations)
\ No newline at end of file
+        self._emit_timer.start()
\ No newline at end of file
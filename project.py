@@ -1,9 +1,107 @@
 import os
+import sys
 import json
+import mmap
+import time
 import logging
+import threading
 from typing import Dict, List, Tuple, Optional, Any
+
+import numpy as np
+
 from utils import generate_distinct_colors
 
+# orjson为可选依赖：C实现的序列化比标准库json快数倍，且原生支持NumPy类型；
+# 未安装时回退到标准库json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# msgpack同为可选依赖：二进制编码对坐标这类数值负载比JSON小2-5倍、
+# 解析也更快；未安装时继续使用JSON格式
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# zstandard为可选依赖：对超过阈值的大项目文件做透明压缩；
+# 未安装时照常写未压缩负载
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 压缩负载的识别魔数与启用压缩的最小负载大小（字节）
+_ZSTD_MAGIC = b"ZSTD"
+_COMPRESS_THRESHOLD = 262144
+
+
+def _json_default(obj):
+    """标准库json的default回调，将NumPy类型转换为原生类型
+
+    只在编码器遇到无法序列化的叶子值时才被调用，原有的dict/list结构
+    直接流式输出，不再为转换递归重建整棵标注树。
+
+    Args:
+        obj: 编码器无法处理的对象
+
+    Returns:
+        对应的Python原生类型
+
+    Raises:
+        TypeError: 对象不是已知的NumPy类型
+    """
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def _intern_annotations(anns: List[Dict]) -> List[Dict]:
+    """对标注dict的键和字符串值做驻留（sys.intern）
+
+    解码后每条标注的"box"/"class"等键和类别名都是独立的str对象，
+    大项目里同样的字符串会重复几十万份；驻留后全部共享同一份内存，
+    键比较也退化为指针比较。
+
+    Args:
+        anns: 单张图片解码出的标注列表
+
+    Returns:
+        键和字符串值已驻留的标注列表
+    """
+    return [
+        {sys.intern(k): (sys.intern(v) if isinstance(v, str) else v)
+         for k, v in ann.items()}
+        if isinstance(ann, dict) else ann
+        for ann in anns
+    ]
+
+
+def _compact_annotations(anns: List[Dict]) -> List[Dict]:
+    """序列化前把框坐标压成整数像素
+
+    拖拽编辑会产生浮点坐标，逐位小数的文本编码既慢又占空间；像素框
+    取整后语义不变。只有含非整数坐标的标注才做浅拷贝，其余原样引用。
+
+    Args:
+        anns: 单张图片的标注列表
+
+    Returns:
+        坐标已取整的标注列表
+    """
+    out = []
+    for ann in anns:
+        box = ann.get('box')
+        if box is not None and len(box) == 4 and not all(type(v) is int for v in box):
+            ann = {**ann, 'box': [int(round(float(v))) for v in box]}
+        out.append(ann)
+    return out
+
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -12,6 +110,10 @@ logger = logging.getLogger(__name__)
 class Project:
     """项目类，管理项目信息和设置，包括标签颜色和缓存标注信息"""
 
+    # 缓存原图像素的内存上限（字节）。超过后按插入顺序释放最旧的图像，
+    # 只保留标注——load()本就约定图像可在需要时重新加载
+    IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
     def __init__(self, name: Optional[str] = None, path: Optional[str] = None):
         # 基本项目信息
         self.name = name if name else "未命名项目"
@@ -31,12 +133,55 @@ class Project:
         self.last_processed_index = 0  # 上次处理的图片索引，用于恢复
 
         # 标注数据缓存
-        self.image_paths = []  # 图片路径列表
+        self._image_paths_set = set()  # 图片路径集合，用于O(1)成员检查
+        self._image_paths_index: Dict[str, int] = {}  # 路径->下标映射
+        self.image_paths = []  # 图片路径列表（setter同步重建集合）
         self.processed_images: Dict[str, Tuple[Optional[Any], List[Dict]]] = {}  # 存储处理过的图片 {路径: (原图, 标注)}
         
         # 添加已标注图片的快速查找集合
         self.labeled_images = set()
 
+        # 批量保存状态：累计未落盘的修改次数，攒够一批再真正写盘
+        self._dirty_count = 0
+        self._last_flush = time.monotonic()
+
+        # 当前缓存的图像像素总字节数，用于限制processed_images的内存占用；
+        # 导出线程池与主线程会并发更新缓存，读写都需持有互斥锁
+        self._image_cache_bytes = 0
+        self._cache_lock = threading.Lock()
+
+        # 路径->文件名缓存：列表刷新时同一路径会被反复取文件名
+        self._basename_cache: Dict[str, str] = {}
+
+    @property
+    def image_paths(self) -> List[str]:
+        """图片路径列表"""
+        return self._image_paths
+
+    @image_paths.setter
+    def image_paths(self, paths: List[str]) -> None:
+        # 所有整体赋值都经过这里，路径集合和下标映射随列表一起重建，
+        # 调用方无需手动保持三者同步
+        self._image_paths = list(paths)
+        self._image_paths_set = set(paths)
+        self._image_paths_index = {
+            path: i for i, path in enumerate(self._image_paths)}
+
+    @property
+    def image_paths_set(self) -> set:
+        """图片路径集合，供界面侧做O(1)成员检查"""
+        if len(self._image_paths_set) != len(self._image_paths):
+            self._image_paths_set = set(self._image_paths)
+        return self._image_paths_set
+
+    @property
+    def image_paths_index(self) -> Dict[str, int]:
+        """路径->下标映射，供界面侧O(1)定位图片在列表中的位置"""
+        if len(self._image_paths_index) != len(self._image_paths):
+            self._image_paths_index = {
+                path: i for i, path in enumerate(self._image_paths)}
+        return self._image_paths_index
+
     @property
     def has_image_dir(self):
         """检查是否设置了图片目录"""
@@ -63,22 +208,6 @@ class Project:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
 
-        # 辅助函数：将NumPy类型转换为Python原生类型
-        def convert_numpy_types(obj):
-            import numpy as np
-            if isinstance(obj, np.integer):
-                return int(obj)
-            elif isinstance(obj, np.floating):
-                return float(obj)
-            elif isinstance(obj, np.ndarray):
-                return obj.tolist()
-            elif isinstance(obj, dict):
-                return {k: convert_numpy_types(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_numpy_types(v) for v in obj]
-            else:
-                return obj
-
         # 只保存必要的信息，不保存原始图像数据
         data = {
             "name": self.name,
@@ -90,20 +219,85 @@ class Project:
             "last_processed_index": self.last_processed_index,
             "image_paths": self.image_paths,
             # 只保存标注信息，不保存图像数据
-            "annotations": convert_numpy_types({
-                path: anns for path, (img, anns) in self.processed_images.items()
-            })
+            "annotations": {
+                path: _compact_annotations(anns)
+                for path, (img, anns) in self.processed_images.items()
+            },
+            # 记录每张已处理图片的文件签名(大小+修改时间)，
+            # 加载时用于识别已被替换或修改的图片，避免复用过期标注
+            "file_sigs": {
+                path: self._file_signature(path) for path in self.processed_images
+            }
         }
 
+        # 先写临时文件再原子替换：写入中途崩溃不会损坏已有项目文件
+        tmp_path = self.path + ".tmp"
         try:
-            with open(self.path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if msgpack is not None:
+                # 二进制格式优先；加载端靠首字节区分（JSON总以'{'开头）
+                payload = msgpack.packb(data, use_bin_type=True, default=_json_default)
+            elif orjson is not None:
+                # orjson在C层处理NumPy标量/数组，无需Python递归转换
+                payload = orjson.dumps(
+                    data, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(
+                    data, ensure_ascii=False, indent=2, default=_json_default).encode('utf-8')
+            # 只压缩大负载：小文件压缩省下的IO抵不过压缩本身的开销
+            if zstandard is not None and len(payload) > _COMPRESS_THRESHOLD:
+                payload = _ZSTD_MAGIC + zstandard.ZstdCompressor(level=3).compress(payload)
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
             logger.info(f"项目保存成功: {self.path}")
             return True
         except Exception as e:
             logger.error(f"保存项目失败: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
             return False
 
+    @staticmethod
+    def _file_signature(path: str):
+        """获取文件签名(大小, 修改时间)，用于判断文件是否被修改过"""
+        try:
+            stat = os.stat(path)
+            return [stat.st_size, int(stat.st_mtime)]
+        except OSError:
+            return None
+
+    @staticmethod
+    def _decode_payload(raw: bytes) -> Dict:
+        """按首字节识别项目文件格式并解码
+
+        本应用写出的JSON始终以'{'开头，msgpack编码的dict首字节不可能
+        是'{'，据此区分两种格式，保持对旧JSON项目文件的兼容。
+
+        Args:
+            raw: 项目文件的完整内容（bytes或mmap等缓冲对象）
+
+        Returns:
+            解码后的项目数据字典
+
+        Raises:
+            ValueError: 文件需要未安装的msgpack或zstandard才能读取
+        """
+        if raw[:4] == _ZSTD_MAGIC:
+            if zstandard is None:
+                raise ValueError("项目文件已压缩，需要安装zstandard才能读取")
+            raw = zstandard.ZstdDecompressor().decompress(raw[4:])
+        if raw[:1] == b'{':
+            if orjson is not None:
+                return orjson.loads(memoryview(raw))
+            return json.loads(bytes(raw).decode('utf-8'))
+        if msgpack is not None:
+            return msgpack.unpackb(memoryview(raw), raw=False)
+        raise ValueError("项目文件为二进制格式，需要安装msgpack才能读取")
+
     def load(self, path: str) -> bool:
         """从文件加载项目，恢复缓存的标注信息"""
         if not os.path.exists(path):
@@ -112,32 +306,64 @@ class Project:
             
         self.path = path
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # 内存映射代替f.read()：解析器直接读页缓存，不再把整个
+            # 文件先复制进Python堆，大项目的加载峰值内存减半
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    logger.error(f"项目文件为空: {path}")
+                    return False
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    data = self._decode_payload(mm)
 
             self.name = data.get("name", "未命名项目")
             self.image_dir = data.get("image_dir", "")
             self.model_path = data.get("model_path", "")
             self.output_dir = data.get("output_dir", "")
             self.class_names = data.get("class_names", [])
-            self.class_colors = data.get("class_colors", generate_distinct_colors(len(self.class_names)))
+            # dict.get的默认值参数会被无条件求值，原来的写法即使文件里
+            # 有颜色也会白跑一遍HSV采样；改为缺失或数量不符时才生成一次
+            stored_colors = data.get("class_colors")
+            if stored_colors and len(stored_colors) == len(self.class_names):
+                self.class_colors = stored_colors
+            else:
+                self.class_colors = generate_distinct_colors(len(self.class_names))
             self.last_processed_index = data.get("last_processed_index", 0)
             self.image_paths = data.get("image_paths", [])
 
-            # 确保颜色数量与标签数量一致
-            if len(self.class_colors) != len(self.class_names):
-                self.class_colors = generate_distinct_colors(len(self.class_names))
-
             # 重置数据结构
             self.processed_images = {}
             self.labeled_images = set()
+            self._image_cache_bytes = 0
+            self._basename_cache = {}
             
             # 只加载标注信息，图像需要重新加载
             annotations = data.get("annotations", {})
+            file_sigs = data.get("file_sigs", {})
+
+            # 一次性枚举图片目录，把逐路径的os.path.exists（每张图一次
+            # stat系统调用，网络盘上尤其慢）换成集合成员检查
+            existing = set()
+            if self.image_dir and os.path.isdir(self.image_dir):
+                try:
+                    existing = {entry.path for entry in os.scandir(self.image_dir)}
+                except OSError:
+                    existing = set()
+            image_dir_prefix = os.path.join(self.image_dir, "") if self.image_dir else ""
+
             for path, anns in annotations.items():
-                # 检查图像文件是否存在
-                if os.path.exists(path):
-                    self.processed_images[path] = (None, anns)  # 图像为None，需要时再加载
+                # 检查图像文件是否存在；目录外的路径退回逐个检查
+                if image_dir_prefix and path.startswith(image_dir_prefix):
+                    path_exists = path in existing
+                else:
+                    path_exists = os.path.exists(path)
+                if path_exists:
+                    # 文件签名不匹配说明图片已被修改或替换，丢弃过期标注以触发重新推理
+                    saved_sig = file_sigs.get(path)
+                    if saved_sig is not None and self._file_signature(path) != saved_sig:
+                        logger.info(f"图片文件已变化，丢弃过期标注: {path}")
+                        continue
+                    # 图像为None，需要时再加载；标注字符串驻留以共享内存
+                    self.processed_images[path] = (None, _intern_annotations(anns))
                     # 更新已标注图片集合
                     if anns and len(anns) > 0:
                         self.labeled_images.add(path)
@@ -151,11 +377,50 @@ class Project:
             logger.error(f"加载项目失败: {e}")
             return False
 
+    def mark_dirty(self) -> None:
+        """记录一次尚未落盘的标注修改"""
+        self._dirty_count += 1
+
+    def maybe_save(self, batch: int = 32, interval: float = 30.0) -> bool:
+        """修改攒够一批或距上次落盘超时后保存项目
+
+        逐张图片触发完整save()的写放大是界面卡顿的主要来源之一；
+        这里把编码和写盘成本摊平到每batch次修改（或interval秒）一次。
+        代价是异常退出时最多丢失batch次标注，关闭路径应调用force_save。
+
+        Args:
+            batch: 触发保存的修改次数阈值
+            interval: 触发保存的时间间隔（秒）
+
+        Returns:
+            本次调用是否实际执行了保存
+        """
+        if self._dirty_count == 0 or not self.path:
+            return False
+        if (self._dirty_count < batch and
+                time.monotonic() - self._last_flush < interval):
+            return False
+        return self.force_save()
+
+    def force_save(self) -> bool:
+        """立即保存并重置未落盘计数，用于关闭/退出路径
+
+        Returns:
+            保存是否成功
+        """
+        if not self.path:
+            return False
+        if self.save():
+            self._dirty_count = 0
+            self._last_flush = time.monotonic()
+            return True
+        return False
+
     @property
     def processed_count(self) -> int:
         """获取已处理（有标注信息）的图片数量"""
-        # 使用集合快速查找已标注的图片
-        return len(self.labeled_images)
+        # 与当前图片集合取交集，目录变化后已不存在的图片不计入统计
+        return len(self.labeled_images & self.image_paths_set)
         
     def update_labeled_status(self, image_path: str, has_annotations: bool) -> None:
         """更新图片的标注状态"""
@@ -170,17 +435,69 @@ class Project:
         # 使用max确保不会出现负数
         return max(0, self.total_count - self.last_processed_index)
     
+    @staticmethod
+    def _image_nbytes(image: Optional[Any]) -> int:
+        """获取图像占用的字节数，非数组（None等）视为0"""
+        return getattr(image, 'nbytes', 0)
+
+    def _evict_images(self) -> None:
+        """释放最旧的缓存图像直到总量回到上限以内，标注保持不变
+
+        调用方必须已持有_cache_lock。复制条目快照再遍历，字典在迭代
+        期间被其他线程插入时不会抛出尺寸变化的RuntimeError。
+        """
+        if self._image_cache_bytes <= self.IMAGE_CACHE_MAX_BYTES:
+            return
+        for path, (img, anns) in list(self.processed_images.items()):
+            if img is None:
+                continue
+            self.processed_images[path] = (None, anns)
+            self._image_cache_bytes -= self._image_nbytes(img)
+            if self._image_cache_bytes <= self.IMAGE_CACHE_MAX_BYTES:
+                break
+
+    def cache_image(self, image_path: str, image: Optional[Any]) -> None:
+        """更新已处理条目的图像缓存，计入内存预算
+
+        浏览/导出时为(None, anns)条目重新加载图像走这里，只换图像
+        不动标注，也不算作一次标注修改；绕过本方法直接写
+        processed_images会让字节计数失真。
+
+        Args:
+            image_path: 图片路径，必须已存在于processed_images
+            image: 重新加载的图像数组
+        """
+        with self._cache_lock:
+            entry = self.processed_images.get(image_path)
+            if entry is None:
+                return
+            self._image_cache_bytes -= self._image_nbytes(entry[0])
+            self.processed_images[image_path] = (image, entry[1])
+            self._image_cache_bytes += self._image_nbytes(image)
+            self._evict_images()
+
     def add_image_annotation(self, image_path: str, image: Optional[Any], annotations: List[Dict]) -> None:
         """添加或更新图片的标注信息"""
-        self.processed_images[image_path] = (image, annotations)
+        with self._cache_lock:
+            old_entry = self.processed_images.get(image_path)
+            if old_entry is not None:
+                self._image_cache_bytes -= self._image_nbytes(old_entry[0])
+            self.processed_images[image_path] = (image, annotations)
+            self._image_cache_bytes += self._image_nbytes(image)
+            self._evict_images()
         # 更新标注状态
         self.update_labeled_status(image_path, len(annotations) > 0)
-    
+        self.mark_dirty()
+
     def remove_image_annotation(self, image_path: str) -> None:
         """移除图片的标注信息"""
-        if image_path in self.processed_images:
-            del self.processed_images[image_path]
+        with self._cache_lock:
+            entry = self.processed_images.pop(image_path, None)
+            if entry is not None:
+                self._image_cache_bytes -= self._image_nbytes(entry[0])
+        if entry is not None:
             self.update_labeled_status(image_path, False)
+            self.mark_dirty()
 
     @property
     def total_count(self):
@@ -201,19 +518,22 @@ class Project:
 
     def has_annotations(self, image_path: str) -> bool:
         """检查图片是否有标注信息"""
-        # 快速检查：先看是否在已标注集合中
-        if image_path in self.labeled_images:
-            return True
-            
-        if image_path in self.processed_images:
-            _, annotations = self.processed_images[image_path]
-            # 添加类型检查，确保annotations不是None
-            has_annots = annotations is not None and len(annotations) > 0
-            # 更新标注状态缓存
-            self.update_labeled_status(image_path, has_annots)
-            return has_annots
-        return False
+        # 单次dict.get即可回答，集合只作为processed_count的统计口径顺带维护
+        entry = self.processed_images.get(image_path)
+        if entry is None:
+            self.labeled_images.discard(image_path)
+            return False
+        has_annots = bool(entry[1])
+        if has_annots:
+            self.labeled_images.add(image_path)
+        else:
+            self.labeled_images.discard(image_path)
+        return has_annots
 
     def get_image_name(self, image_path):
-        """获取图片文件名"""
-        return os.path.basename(image_path)
+        """获取图片文件名（带缓存）"""
+        name = self._basename_cache.get(image_path)
+        if name is None:
+            name = os.path.basename(image_path)
+            self._basename_cache[image_path] = name
+        return name
@@ -1,14 +1,14 @@
 import logging
 import os
 import random
-import shutil
-from typing import Optional, List, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, List, Dict, Tuple, Any
 
-import cv2
 import numpy as np
 import torch
-from PySide6.QtCore import (Qt, QTimer, QCoreApplication)
-from PySide6.QtGui import (QColor, QAction, QIcon)
+from PySide6.QtCore import (Qt, QTimer, QThread, Signal, QCoreApplication)
+from PySide6.QtGui import (QBrush, QColor, QAction, QIcon)
 from PySide6.QtWidgets import (QMainWindow, QPushButton, QLabel, QFileDialog,
                                QVBoxLayout, QHBoxLayout, QWidget, QProgressBar, QListWidget, QSplitter, QMessageBox,
                                QInputDialog, QListWidgetItem, QGroupBox, QFormLayout,
@@ -19,7 +19,7 @@ from ultralytics import YOLO
 from dialogs import DatasetSplitDialog, ClassManagementDialog
 from image_editor import ImageEditor
 from project import Project
-from utils import generate_distinct_colors
+from utils import generate_distinct_colors, link_or_copy, imread_bgr
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -27,6 +27,55 @@ logger = logging.getLogger(__name__)
 # 应用程序版本信息
 APP_VERSION = "1.0.0"
 
+# 支持的图片扩展名（元组形式，str.endswith可直接接受并在C层匹配）
+_IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp')
+
+
+class InferenceWorker(QThread):
+    """后台推理线程，使GUI线程只负责渲染进度和当前图片
+
+    在主线程上逐批调用model.predict会在大数据集上冻结界面，并把
+    磁盘读取与GPU计算串行化。工作线程按批拉取待处理路径、预取
+    下一批的解码任务，推理结果通过信号投递回主线程应用。
+    """
+
+    # 每批推理结果 [(路径, 图像, 标注列表)]
+    batch_ready = Signal(list)
+    # 推理失败的批次 (本批路径列表, 错误信息)
+    batch_failed = Signal(list, str)
+    # 处理进度 (已处理数, 总数)
+    progress_changed = Signal(int, int)
+
+    def __init__(self, tool: "YOLOAnnotationTool", pending_paths: List[str], parent=None):
+        super().__init__(parent)
+        self._tool = tool
+        self._pending = list(pending_paths)
+        self._stop_requested = False
+
+    def stop(self) -> None:
+        """请求在当前批次结束后停止"""
+        self._stop_requested = True
+
+    def run(self) -> None:
+        tool = self._tool
+        total = len(self._pending)
+        batch = max(1, tool.batch_size)
+        done = 0
+        for start in range(0, total, batch):
+            if self._stop_requested:
+                break
+            chunk = self._pending[start:start + batch]
+            # 在GPU处理本批次期间，后台线程提前解码下一批图片
+            tool._prefetch_decode(self._pending[start + batch:start + 2 * batch])
+            try:
+                results = tool.process_image_batch(chunk)
+            except Exception as e:
+                self.batch_failed.emit(chunk, str(e))
+            else:
+                self.batch_ready.emit(results)
+            done += len(chunk)
+            self.progress_changed.emit(done, total)
+
 
 class YOLOAnnotationTool(QMainWindow):
     """带项目管理、彩色标签的YOLO自动标注工具主窗口"""
@@ -37,10 +86,40 @@ class YOLOAnnotationTool(QMainWindow):
         # 在__init__中定义所有实例属性
         self.current_project: Optional[Project] = None
         self.current_image_idx: int = -1
-        self.current_process_idx: int = -1
         self.model: Optional[YOLO] = None
         self.loaded_model_path: str = ""
+        # 是否使用FP16半精度推理（在支持TensorCore的GPU上自动开启）
+        self._use_half: bool = False
+        # 允许保留的模型类别ID缓存 (标签元组, ID数组)
+        self._allowed_ids_cache: Optional[tuple] = None
+        # 上次刷新进度显示的时间戳，用于限制批处理期间的刷新频率
+        self._last_progress_refresh: float = 0.0
         self.filter_mode: str = "all"  # "all", "labeled", "unlabeled"
+        # 批量推理的批次大小，批量调用模型以摊薄单次调用的开销
+        self.batch_size: int = 8
+        # 后台解码线程池，让磁盘读取+JPEG解码与GPU推理重叠
+        self._decode_pool: Optional[ThreadPoolExecutor] = None
+        self._pending_decodes: Dict[str, Any] = {}  # {路径: Future}
+        # 后台推理线程与失败批次计数（用于限制错误弹窗频率）
+        self._inference_worker: Optional[InferenceWorker] = None
+        self._failed_batches: int = 0
+        # 处理失败记录 [(图片路径, 错误信息)]
+        self.error_log: List[tuple] = []
+        # 统计标签模板与上次显示的文本：免去每帧解析格式串，
+        # 文本未变化时跳过setText避免无谓的重绘
+        self._stats_tmpl = "图片总数量：{t} 已标注数量：{p} 当前图片索引：{c}/{t}"
+        self._last_stats_text = ""
+        # 编辑器当前展示的图片路径。标注更新信号以此归属：切换图片时
+        # 编辑器会先冲刷挂起的合并信号，而此刻current_image_idx可能
+        # 已经指向新图片，不能用它反推路径
+        self._editor_image_path: Optional[str] = None
+        # 已加载模型缓存 {模型路径: YOLO实例}，会话内切换模型免去重新解析权重
+        self._model_cache: Dict[str, YOLO] = {}
+        # 列表项前景画刷，避免每次刷新为每个列表项新建QColor临时对象
+        self._brush_labeled = QBrush(QColor(0, 128, 0))
+        self._brush_default = QBrush(QColor(0, 0, 0))
+        # 路径->列表行号映射，查找/恢复选中项无需线性扫描整个列表
+        self._path_to_row: Dict[str, int] = {}
         # 添加一个标志，防止快速按键导致的重复处理
         self.is_completing_annotation = False
         # 添加一个标志，表示模型是否正在加载
@@ -392,12 +471,12 @@ class YOLOAnnotationTool(QMainWindow):
         # 设置初始标签和颜色（新增部分）
         self.current_project.class_names = class_names
         self.current_project.class_colors = generate_distinct_colors(len(class_names))
-        self.current_process_idx = self.current_project.last_processed_index
         self.current_image_idx = -1
         self.update_project_info()
         self.update_image_list()
         self.image_editor.set_image(None)
         self.image_editor.set_annotations([])
+        self._editor_image_path = None
         self.image_editor.set_class_info(
             self.current_project.class_names,
             self.current_project.class_colors
@@ -435,12 +514,12 @@ class YOLOAnnotationTool(QMainWindow):
         self.current_project = Project()
         if self.current_project.load(project_path):
             # 恢复上次处理的位置
-            self.current_process_idx = self.current_project.last_processed_index
             self.current_image_idx = self.current_project.last_processed_index
             self.update_project_info()
             self.update_image_list()
             self.image_editor.set_image(None)
             self.image_editor.set_annotations([])
+            self._editor_image_path = None
             self.image_editor.set_class_info(
                 self.current_project.class_names,
                 self.current_project.class_colors
@@ -554,23 +633,22 @@ class YOLOAnnotationTool(QMainWindow):
             self.current_project.image_dir = dir_path
             self.image_dir_label.setText(dir_path)
 
-            # 获取目录中的图片文件
-            image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+            # 获取目录中的图片文件：scandir的DirEntry自带文件类型信息，
+            # 免去listdir后逐个stat；endswith元组匹配在C层完成
             self.current_project.image_paths = []
-
-            # 使用列表推导式提高性能
             try:
-                files = os.listdir(dir_path)
-                # 使用集合查找提高性能
-                image_files = [
-                    os.path.join(dir_path, file) for file in files
-                    if os.path.splitext(file)[1].lower() in image_extensions
-                ]
+                file_names = set()
+                image_files = []
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        file_names.add(entry.name)
+                        if entry.is_file() and entry.name.lower().endswith(_IMAGE_EXTS):
+                            image_files.append(entry.path)
                 # 按文件名排序
-                image_files.sort(key=lambda x: os.path.basename(x))
+                image_files.sort(key=os.path.basename)
                 self.current_project.image_paths = image_files
                 # 更新目录内容缓存
-                self.last_directory_contents = set(files)
+                self.last_directory_contents = file_names
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"读取目录失败: {str(e)}")
                 return
@@ -592,6 +670,7 @@ class YOLOAnnotationTool(QMainWindow):
         """
         if not self.current_project:
             self.image_list.clear()
+            self._path_to_row = {}
             logger.debug("当前无项目，清空图片列表")
             return
 
@@ -603,8 +682,8 @@ class YOLOAnnotationTool(QMainWindow):
         if current_item:
             current_selected = current_item.data(Qt.ItemDataRole.UserRole)
 
-        # 使用缓存的labeled_images集合优化查询性能
-        labeled_images_set = getattr(self.current_project, 'labeled_images', set())
+        # Project在__init__中始终维护labeled_images集合，直接引用即可
+        labeled_images_set = self.current_project.labeled_images
 
         # 根据筛选模式过滤图片
         filtered_paths: List[str] = []
@@ -619,50 +698,61 @@ class YOLOAnnotationTool(QMainWindow):
             filtered_paths = [path for path in self.current_project.image_paths
                               if path not in labeled_images_set]
         
-        # 按文件名排序
-        filtered_paths.sort(key=lambda x: os.path.basename(x))
-
-        # 只在图片数量发生变化时才重新构建整个列表
-        if self.image_list.count() != len(filtered_paths):
-            logger.debug(f"图片数量变化，重新构建列表: {len(filtered_paths)} 张图片")
-            self.image_list.clear()
-            for path in filtered_paths:
-                item = QListWidgetItem(os.path.basename(path))
+        # 按文件名排序，复用项目级的文件名缓存
+        get_name = self.current_project.get_image_name
+        filtered_paths.sort(key=get_name)
+
+        # 差量更新列表：只增删变化的行。过滤切换时整表clear+重建会为
+        # 每个未变化的行重新创建控件项；新旧列表都按文件名有序，先自
+        # 底向上移除多余行，再按序补齐缺失行即可对齐
+        filtered_set = set(filtered_paths)
+        for row in range(self.image_list.count() - 1, -1, -1):
+            if self.image_list.item(row).data(Qt.ItemDataRole.UserRole) not in filtered_set:
+                self.image_list.takeItem(row)
+        for row, path in enumerate(filtered_paths):
+            item = self.image_list.item(row)
+            if item is None or item.data(Qt.ItemDataRole.UserRole) != path:
+                item = QListWidgetItem(get_name(path))
                 item.setData(Qt.ItemDataRole.UserRole, path)
                 # 设置工具提示，显示完整路径
                 item.setToolTip(path)
-                self.image_list.addItem(item)
-
-        # 批量更新所有项目的颜色状态（只更新状态，不重建列表）
+                self.image_list.insertItem(row, item)
+        # update_single_item_in_list把新出现的项追加在列表末尾，现有行
+        # 因此未必有序，错位的行会被上面的补齐插入挤到尾部；对齐后前
+        # len(filtered_paths)行必然就是filtered_paths本身，多余行全在
+        # 尾部，统一截掉
+        for row in range(self.image_list.count() - 1, len(filtered_paths) - 1, -1):
+            self.image_list.takeItem(row)
+
+        # 批量更新所有项目的颜色状态（只更新状态，不重建列表），
+        # 同时重建路径->行号映射
+        path_to_row: Dict[str, int] = {}
         for i in range(self.image_list.count()):
             item = self.image_list.item(i)
             image_path = item.data(Qt.ItemDataRole.UserRole)
+            path_to_row[image_path] = i
             # 标记有标注信息的图片为绿色，使用集合查询提高性能
             if image_path in labeled_images_set:
-                item.setForeground(QColor(0, 128, 0))
-                item.setText(f"{os.path.basename(image_path)}")
+                item.setForeground(self._brush_labeled)
             else:
-                item.setForeground(QColor(0, 0, 0))  # 默认黑色
-                item.setText(os.path.basename(image_path))
+                item.setForeground(self._brush_default)  # 默认黑色
+            item.setText(get_name(image_path))
+        self._path_to_row = path_to_row
 
-        # 优化选中状态恢复逻辑
+        # 恢复选中状态：映射查找代替线性扫描
         if current_selected:
             # 优先尝试恢复之前选中的图片
-            for i in range(self.image_list.count()):
-                item = self.image_list.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == current_selected:
-                    self.image_list.setCurrentItem(item)
-                    logger.debug(f"恢复选中的图片: {os.path.basename(current_selected)}")
-                    break
+            row = path_to_row.get(current_selected)
+            if row is not None:
+                self.image_list.setCurrentRow(row)
+                logger.debug(f"恢复选中的图片: {get_name(current_selected)}")
         elif self.image_list.count() > 0 and self.current_image_idx >= 0:
             # 如果当前图片在筛选结果中，确保它被选中
             current_image_path = self.current_project.image_paths[self.current_image_idx]
-            for i in range(self.image_list.count()):
-                item = self.image_list.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == current_image_path:
-                    self.image_list.setCurrentItem(item)
-                    logger.debug(f"选中当前图片索引: {self.current_image_idx}")
-                    break
+            row = path_to_row.get(current_image_path)
+            if row is not None:
+                self.image_list.setCurrentRow(row)
+                logger.debug(f"选中当前图片索引: {self.current_image_idx}")
 
         # 更新进度标签
         self.update_progress_label()
@@ -670,15 +760,15 @@ class YOLOAnnotationTool(QMainWindow):
     def update_progress_label(self):
         """更新进度标签显示"""
         if not self.current_project or not self.current_project.image_paths:
-            self.stats_label.setText("图片总数量：0 已标注数量：0 当前图片索引：0/0")
-            return
-
-        total = self.current_project.total_count
-        processed = self.current_project.processed_count
-        current_index = self.current_image_idx + 1 if self.current_image_idx >= 0 else 0
-        self.stats_label.setText(f"图片总数量：{total} 已标注数量：{processed} 当前图片索引：{current_index}/{total}")
-        # 立即处理事件队列，确保UI及时更新
-        QCoreApplication.processEvents()
+            new_text = self._stats_tmpl.format(t=0, p=0, c=0)
+        else:
+            total = self.current_project.total_count
+            processed = self.current_project.processed_count
+            current_index = self.current_image_idx + 1 if self.current_image_idx >= 0 else 0
+            new_text = self._stats_tmpl.format(t=total, p=processed, c=current_index)
+        if new_text != self._last_stats_text:
+            self._last_stats_text = new_text
+            self.stats_label.setText(new_text)
 
     def select_model_file(self) -> None:
         """选择并设置YOLO模型文件路径
@@ -753,152 +843,226 @@ class YOLOAnnotationTool(QMainWindow):
         return ready
 
     def start_processing(self):
-        """开始处理图片（从当前位置开始）"""
+        """开始处理图片（从当前位置开始），推理在后台线程执行"""
         if not self.current_project or not self.is_process_ready:
             return
+        if self._inference_worker is not None and self._inference_worker.isRunning():
+            logger.info("推理线程已在运行，忽略重复的开始请求")
+            return
+
+        # 收集待处理的图片路径（跳过已处理的）
+        start_idx = self.current_project.last_processed_index
+        pending = [path for path in self.current_project.image_paths[start_idx:]
+                   if path not in self.current_project.processed_images]
+        if not pending:
+            logger.info("没有待处理的图片，直接进入完成回调")
+            self.on_processing_finished()
+            return
 
         self.set_widgets_enabled(False)
-        self.current_process_idx = self.current_project.last_processed_index
-        # 使用 QTimer.singleShot 避免递归调用导致的栈溢出
-        QTimer.singleShot(1, self.process_next_image)  # 开始处理第一张
+        self._failed_batches = 0
+        logger.info(f"启动后台推理线程，待处理 {len(pending)} 张图片")
+        worker = InferenceWorker(self, pending, self)
+        worker.batch_ready.connect(self.on_batch_ready)
+        worker.batch_failed.connect(self.on_batch_failed)
+        worker.progress_changed.connect(self.on_inference_progress)
+        worker.finished.connect(self.on_processing_finished)
+        self._inference_worker = worker
+        worker.start()
+
+    def on_batch_ready(self, batch_results: list) -> None:
+        """应用后台线程产出的一批推理结果（主线程槽函数）"""
+        for image_path, image, annotations in batch_results:
+            self.on_single_image_processed(image_path, image, annotations)
+        if batch_results:
+            # 记录处理进度，供下次打开项目时恢复
+            last_path = batch_results[-1][0]
+            idx = self.current_project.image_paths_index.get(last_path)
+            if idx is not None:
+                self.current_project.last_processed_index = idx + 1
+
+    def on_batch_failed(self, batch_paths: list, error_msg: str) -> None:
+        """记录后台推理失败的批次（主线程槽函数）"""
+        logger.error(f"批次 {[os.path.basename(p) for p in batch_paths]} 处理错误: {error_msg}")
+
+        # 避免频繁弹窗，只在前几次失败或周期性地提示
+        self._failed_batches += 1
+        if self._failed_batches <= 2 or self._failed_batches % 50 == 0:
+            QMessageBox.warning(self, "处理错误", f"批量处理时出错:\n{error_msg}")
+
+        # 记录错误到错误日志
+        for path in batch_paths:
+            self.error_log.append((path, error_msg))
+
+    def on_inference_progress(self, done: int, total: int) -> None:
+        """刷新后台推理进度（主线程槽函数，限频）"""
+        now = time.monotonic()
+        if now - self._last_progress_refresh > 0.1:
+            self._last_progress_refresh = now
+            self.update_progress()
+            self.statusBar().showMessage(
+                f"正在处理 {done}/{total} ({self.current_project.progress}%)")
 
-    def process_next_image(self) -> None:
-        """处理下一张图片，实现批处理的核心逻辑
-        
-        检查处理进度，更新UI状态，处理单张图片，并在完成或出错时继续下一张。
-        使用QTimer避免递归调用导致的栈溢出问题。
+    def _prefetch_decode(self, image_paths: List[str]) -> None:
+        """提交后台解码任务，使图片读取与模型推理重叠
+
+        Args:
+            image_paths: 需要预解码的图片路径列表
         """
-        # 检查是否所有图片都已处理完成
-        if self.current_process_idx >= len(self.current_project.image_paths):
-            logger.info("所有图片处理完成，调用完成回调")
-            self.on_processing_finished()
+        if not image_paths:
             return
+        if self._decode_pool is None:
+            self._decode_pool = ThreadPoolExecutor(max_workers=4)
+        for path in image_paths:
+            if path not in self._pending_decodes:
+                self._pending_decodes[path] = self._decode_pool.submit(imread_bgr, path)
+
+    def _read_image(self, image_path: str) -> Optional[np.ndarray]:
+        """读取图片，优先消费后台预解码的结果"""
+        future = self._pending_decodes.pop(image_path, None)
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                logger.warning(f"后台解码失败，回退到同步读取: {str(e)}")
+        return imread_bgr(image_path)
 
-        # 更新进度条和标签
-        self.update_progress()
-        QCoreApplication.processEvents()
-
-        # 添加进度信息到状态栏
-        total = len(self.current_project.image_paths)
-        current = self.current_process_idx + 1
-        status_text = f"正在处理 {current}/{total} ({self.current_project.progress}%)"
-        self.statusBar().showMessage(status_text)
+    def process_image_batch(self, image_paths: List[str]) -> List[tuple]:
+        """批量处理多张图片，一次模型调用完成整批推理
 
-        # 获取当前要处理的图片路径
-        current_image_path = self.current_project.image_paths[self.current_process_idx]
-        current_image_name = os.path.basename(current_image_path)
+        Args:
+            image_paths: 图片文件路径列表
 
-        logger.info(f"处理图片 {current}/{total}: {current_image_name}")
+        Returns:
+            列表，每个元素为(图片路径, 图片数组, 标注列表)
 
-        # 如果已处理过则跳过
-        if current_image_path in self.current_project.processed_images:
-            logger.debug(f"图片已处理，跳过: {current_image_name}")
-            self.current_process_idx += 1
-            # 使用单次定时器而不是递归调用，避免栈溢出
-            QTimer.singleShot(1, self.process_next_image)
-            return
+        Raises:
+            Exception: 模型加载或推理失败时抛出
+        """
+        # 检查模型是否成功加载
+        if not hasattr(self, 'model') or self.model is None:
+            raise Exception("模型加载失败，无法进行推理")
 
-        try:
-            # 直接在主线程处理图片
-            image, annotations = self.process_single_image(current_image_path)
+        # 解码整批图片，过滤读取失败的
+        valid_paths: List[str] = []
+        images: List[np.ndarray] = []
+        for path in image_paths:
+            logger.debug(f"读取图片: {path}")
+            image = self._read_image(path)
+            if image is None:
+                logger.error(f"无法读取图片文件: {path}")
+                continue
+            valid_paths.append(path)
+            images.append(image)
 
-            # 仅当成功处理且有有效标注时才调用回调
-            if image is not None:
-                logger.debug(f"成功处理图片，准备回调: {current_image_name}")
-                self.on_single_image_processed(current_image_path, image, annotations)
-            else:
-                logger.error(f"图片处理返回空结果: {current_image_name}")
-                raise Exception("图片处理返回空结果")
+        if not images:
+            raise Exception("本批次没有可读取的图片文件")
 
+        batch_results: List[tuple] = []
+        try:
+            # 一次调用完成整批推理，摊薄每次调用的固定开销；
+            # stream=True返回生成器，逐个产出结果，避免整批张量同时驻留显存，
+            # GPU可以在CPU后处理当前结果的同时继续推理后续图片
+            logger.debug(f"执行批量模型推理: {len(images)} 张图片")
+            # inference_mode关闭自动求导的版本计数等记录开销；
+            # stream=True返回生成器，结果消费需留在上下文内
+            with torch.inference_mode():
+                results = self.model.predict(images, stream=True, verbose=False,
+                                             batch=len(images), half=self._use_half)
+                for path, image, result in zip(valid_paths, images, results):
+                    annotations = self._annotations_from_result(result)
+                    logger.info(f"图片处理完成: {os.path.basename(path)}, 检测到 {len(annotations)} 个有效标注")
+                    batch_results.append((path, image, annotations))
         except Exception as e:
-            error_msg = f"处理失败: {str(e)}"
-            logger.error(f"图片 {current_image_path} 处理错误: {error_msg}")
-
-            # 避免频繁弹窗，只在处理少量图片或重要错误时显示
-            if self.current_process_idx < 10 or (self.current_process_idx % 50 == 0):
-                QMessageBox.warning(self, "处理错误", f"处理 {current_image_name} 时出错:\n{error_msg}")
+            logger.exception(f"模型推理失败")
+            raise Exception(f"模型推理失败: {str(e)}")
 
-            # 记录错误到错误日志
-            if hasattr(self, 'error_log'):
-                self.error_log.append((current_image_path, str(e)))
+        # 释放CUDA内存
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            logger.debug("CUDA缓存已清理")
 
-            # 继续处理下一张图片
-            self.current_process_idx += 1
-            QTimer.singleShot(1, self.process_next_image)
+        return batch_results
 
     def process_single_image(self, image_path: str) -> tuple[np.ndarray, List[Dict[str, Any]]]:
         """处理单张图片的核心逻辑
-        
+
         Args:
             image_path: 图片文件路径
-            
+
         Returns:
             tuple: (处理后的图片数组, 标注列表)
-            
+
         Raises:
             Exception: 模型加载或推理失败时抛出
         """
+        batch_results = self.process_image_batch([image_path])
+        if not batch_results:
+            raise Exception(f"无法读取图片文件: {os.path.basename(image_path)}")
+        _, image, annotations = batch_results[0]
+        return image, annotations
 
-        # 检查模型是否成功加载
-        if not hasattr(self, 'model') or self.model is None:
-            raise Exception("模型加载失败，无法进行推理")
+    def _annotations_from_result(self, result) -> List[Dict[str, Any]]:
+        """将单个推理结果转换为标注列表
 
-        # 处理图片
-        logger.debug(f"读取图片: {image_path}")
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.error(f"无法读取图片文件: {image_path}")
-            raise Exception(f"无法读取图片文件: {os.path.basename(image_path)}")
+        Args:
+            result: 模型推理返回的单张图片结果
 
-        try:
-            # 使用优化的模型推理参数
-            logger.debug(f"执行模型推理: {os.path.basename(image_path)}")
-            results = self.model(image, verbose=False, batch=1)
-            logger.debug(f"模型推理完成，检测到 {sum(len(result.boxes) for result in results)} 个对象")
-        except Exception as e:
-            logger.exception(f"模型推理失败")
-            raise Exception(f"模型推理失败: {str(e)}")
+        Returns:
+            标注列表，每个标注为包含box/confidence/class_id/class的字典
+        """
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return []
 
-        annotations: List[Dict[str, Any]] = []
-        # 创建类名字典以提高查找性能
-        class_names_set = set(self.current_project.class_names)
+        model_names = result.names
         # 添加置信度阈值配置
         confidence_threshold = getattr(self.current_project, 'confidence_threshold', 0.25)
+        allowed_ids = self._get_allowed_class_ids(model_names)
 
-        for result in results:
-            boxes = result.boxes
-            if len(boxes) > 0:
-                boxes_np = boxes.cpu().numpy()
-                model_names = result.names
-                for box in boxes_np:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    conf = box.conf[0]
-                    # 根据置信度阈值过滤低置信度检测
-                    if conf < confidence_threshold:
-                        continue
+        # 先在设备端完成置信度和类别过滤，再把筛选后的少量数据传回主机，
+        # 减少D2H传输量（被过滤的框通常占多数）
+        conf_t = boxes.conf
+        cls_t = boxes.cls
+        mask_t = (conf_t >= confidence_threshold) & torch.isin(
+            cls_t, torch.as_tensor(allowed_ids, device=cls_t.device))
 
-                    cls = int(box.cls[0])
-                    class_name = model_names[cls]
-                    # 使用集合查找提高性能
-                    if class_name in class_names_set:
-                        annotations.append({
-                            "box": (int(x1), int(y1), int(x2), int(y2)),
-                            "confidence": float(conf),
-                            "class_id": int(cls),
-                            "class": class_name
-                        })
+        xyxy = boxes.xyxy[mask_t].cpu().numpy().astype(np.int32)
+        conf = conf_t[mask_t].cpu().numpy()
+        cls = cls_t[mask_t].cpu().numpy().astype(np.int32)
+
+        annotations: List[Dict[str, Any]] = []
+        for i in range(len(cls)):
+            annotations.append({
+                "box": (int(xyxy[i, 0]), int(xyxy[i, 1]), int(xyxy[i, 2]), int(xyxy[i, 3])),
+                "confidence": float(conf[i]),
+                "class_id": int(cls[i]),
+                "class": model_names[int(cls[i])]
+            })
 
         # 应用非极大值抑制(NMS)去除重叠的边界框，只保留置信度最高的
         if len(annotations) > 1:
             annotations = self.apply_nms(annotations)
 
-        # 释放CUDA内存
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            logger.debug("CUDA缓存已清理")
+        return annotations
 
-        logger.info(f"图片处理完成: {os.path.basename(image_path)}, 检测到 {len(annotations)} 个有效标注")
-        return image, annotations
+    def _get_allowed_class_ids(self, model_names: Dict[int, str]) -> np.ndarray:
+        """获取项目标签对应的模型类别ID数组，带缓存
+
+        Args:
+            model_names: 模型的类别ID到名称的映射
+
+        Returns:
+            允许保留的类别ID数组
+        """
+        cache_key = tuple(self.current_project.class_names)
+        if self._allowed_ids_cache is None or self._allowed_ids_cache[0] != cache_key:
+            class_names_set = set(cache_key)
+            allowed = np.array(
+                [i for i, name in model_names.items() if name in class_names_set],
+                dtype=np.int32)
+            self._allowed_ids_cache = (cache_key, allowed)
+        return self._allowed_ids_cache[1]
 
     def apply_nms(self, annotations: List[Dict[str, Any]], iou_threshold: float = 0.5) -> List[Dict[str, Any]]:
         """应用非极大值抑制(NMS)去除重叠的边界框
@@ -979,97 +1143,86 @@ class YOLOAnnotationTool(QMainWindow):
 
     def update_single_item_in_list(self, image_path):
         """更新列表中单个图片项的状态，支持筛选模式"""
-        # 检查当前筛选模式是否应该显示此图片
+        # 检查当前筛选模式是否应该显示此图片；
+        # has_annotations本身就查processed_images，无需先复制一份键集合
         should_show = True
-        processed_images_set = set(self.current_project.processed_images.keys())
-
         if self.filter_mode == "labeled":
             # 只显示已标注的图片
-            should_show = image_path in processed_images_set and self.current_project.has_annotations(image_path)
+            should_show = self.current_project.has_annotations(image_path)
         elif self.filter_mode == "unlabeled":
             # 只显示未标注的图片
-            should_show = not (image_path in processed_images_set and self.current_project.has_annotations(image_path))
+            should_show = not self.current_project.has_annotations(image_path)
 
-        # 查找现有项
-        item_index = -1
-        for i in range(self.image_list.count()):
-            item = self.image_list.item(i)
-            path = item.data(Qt.ItemDataRole.UserRole)
-            if path == image_path:
-                item_index = i
-                break
+        # 通过路径->行号映射直接定位现有项
+        item_index = self._path_to_row.get(image_path, -1)
 
         # 如果应该显示但未找到，添加到列表
         if should_show and item_index == -1:
-            item = QListWidgetItem(os.path.basename(image_path))
+            item = QListWidgetItem(self.current_project.get_image_name(image_path))
             item.setData(Qt.ItemDataRole.UserRole, image_path)
             self.image_list.addItem(item)
             item_index = self.image_list.count() - 1
+            self._path_to_row[image_path] = item_index
 
-        # 如果不应该显示但找到了，从列表中移除
+        # 如果不应该显示但找到了，从列表中移除，其后行号整体前移
         elif not should_show and item_index != -1:
             self.image_list.takeItem(item_index)
+            del self._path_to_row[image_path]
+            for path, row in self._path_to_row.items():
+                if row > item_index:
+                    self._path_to_row[path] = row - 1
             return
 
         # 如果应该显示且找到了，更新状态
         if should_show and item_index != -1:
             item = self.image_list.item(item_index)
             # 重置颜色为默认黑色
-            item.setForeground(QColor(0, 0, 0))
+            item.setForeground(self._brush_default)
 
             # 标记有标注信息的图片为绿色
-            if image_path in processed_images_set and self.current_project.has_annotations(image_path):
+            if self.current_project.has_annotations(image_path):
                 # 有标注信息 - 绿色
-                item.setForeground(QColor(0, 128, 0))
+                item.setForeground(self._brush_labeled)
 
     def on_single_image_processed(self, image_path: str, image: np.ndarray, annotations: List[Dict[str, Any]]) -> None:
         """单张图片处理完成回调
-        
+
+        只负责应用单张图片的处理结果并刷新界面，批次推进由InferenceWorker统一调度。
+
         Args:
             image_path: 图片文件路径
             image: 处理后的图片数组
             annotations: 检测到的标注列表
         """
         try:
-            # 更新项目状态
-            self.current_project.processed_images[image_path] = (image, annotations)
-            self.current_project.last_processed_index = self.current_process_idx
-
-            # 更新已标注图片缓存集合，优化后续查询性能
-            if not hasattr(self.current_project, 'labeled_images'):
-                self.current_project.labeled_images = set()
-            self.current_project.labeled_images.add(image_path)
+            # 更新项目状态（统一走Project的API，附带标注集合维护和内存预算）
+            self.current_project.add_image_annotation(image_path, image, annotations)
 
             logger.debug(f"更新项目状态: {os.path.basename(image_path)}, 标注数量: {len(annotations)}")
 
             # 更新单个列表项状态
             self.update_single_item_in_list(image_path)
 
-            # 更新进度
-            self.update_progress()
+            # 更新进度（限频，最终进度由完成回调统一刷新）
+            now = time.monotonic()
+            if now - self._last_progress_refresh > 0.1:
+                self._last_progress_refresh = now
+                self.update_progress()
 
-            # 显示当前处理的图片
-            self.current_image_idx = self.current_process_idx
+            # 显示当前处理的图片（映射查找，避免每张图O(N)扫描路径列表）
+            idx = self.current_project.image_paths_index.get(image_path)
+            if idx is not None:
+                self.current_image_idx = idx
             self.show_current_image()
 
             # 恢复UI交互
             self.set_widgets_enabled(True)
 
-            # 继续处理下一张，使用定时器避免递归调用导致的栈溢出
-            self.current_process_idx += 1
-            self.current_project.last_processed_index = self.current_process_idx
-            QTimer.singleShot(1, self.process_next_image)
-
         except Exception as e:
             error_msg = f"处理回调失败: {str(e)}"
             logger.error(f"图片 {image_path} 处理回调错误: {error_msg}")
             QMessageBox.critical(self, "处理回调错误", f"处理 {os.path.basename(image_path)} 回调时出错:\n{error_msg}")
 
-            # 确保即使出错也能继续处理
-            self.current_process_idx += 1
-            self.current_project.last_processed_index = self.current_process_idx
-            QTimer.singleShot(1, self.process_next_image)
-
     def show_current_image(self):
         """显示当前图片和带颜色的标注"""
         if (not self.current_project or
@@ -1081,11 +1234,9 @@ class YOLOAnnotationTool(QMainWindow):
         self._display_image_with_inference(image_path)
 
         # 高亮显示列表中的当前项
-        for i in range(self.image_list.count()):
-            item = self.image_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == image_path:
-                self.image_list.setCurrentItem(item)
-                break
+        row = self._path_to_row.get(image_path)
+        if row is not None:
+            self.image_list.setCurrentRow(row)
         self.image_editor.update()
 
         # 更新进度
@@ -1103,11 +1254,17 @@ class YOLOAnnotationTool(QMainWindow):
         """
         # 如果当前图片没有标注信息，则自动进行推理处理
         if not self.current_project.has_annotations(image_path):
+            # 后台推理线程运行期间不在主线程并发调用模型，等待其结果投递
+            if self._inference_worker is not None and self._inference_worker.isRunning():
+                self.image_editor.set_image(None)
+                self.image_editor.set_annotations([])
+                self._editor_image_path = None
+                return
             try:
                 # 进行推理处理
                 image, annotations = self.process_single_image(image_path)
-                # 更新项目状态
-                self.current_project.processed_images[image_path] = (image, annotations)
+                # 更新项目状态（经由Project的API维护标注集合与内存预算）
+                self.current_project.add_image_annotation(image_path, image, annotations)
 
                 # 更新列表项状态
                 self.update_single_item_in_list(image_path)
@@ -1117,6 +1274,7 @@ class YOLOAnnotationTool(QMainWindow):
                 QMessageBox.warning(self, "处理错误", f"处理 {os.path.basename(image_path)} 时出错:\n{error_msg}")
                 self.image_editor.set_image(None)
                 self.image_editor.set_annotations([])
+                self._editor_image_path = None
                 return
 
         # 显示图片和标注
@@ -1125,27 +1283,31 @@ class YOLOAnnotationTool(QMainWindow):
 
             # 如果图像为None（从项目加载的情况），重新加载
             if image is None:
-                image = cv2.imread(image_path)
-                # 仅在图像成功加载时更新缓存
+                image = imread_bgr(image_path)
+                # 仅在图像成功加载时更新缓存，经cache_image计入内存预算
                 if image is not None:
-                    self.current_project.processed_images[image_path] = (image, annotations)
+                    self.current_project.cache_image(image_path, image)
 
             if image is not None:
                 self.image_editor.set_image(image)
                 self.image_editor.set_annotations(annotations)
+                self._editor_image_path = image_path
             else:
                 # 图像加载失败的处理
                 QMessageBox.warning(self, "错误", f"无法加载图片: {image_path}")
                 self.image_editor.set_image(None)
                 self.image_editor.set_annotations([])
+                self._editor_image_path = None
 
         else:
             # 图像不在processed_images中
             self.image_editor.set_image(None)
             self.image_editor.set_annotations([])
+            self._editor_image_path = None
 
     def on_processing_finished(self):
         """所有图片处理完成后的回调"""
+        self._inference_worker = None
         self.update_progress()
         QCoreApplication.processEvents()
         # 启用按钮
@@ -1166,8 +1328,9 @@ class YOLOAnnotationTool(QMainWindow):
             return
 
         image_path = item.data(Qt.ItemDataRole.UserRole)
-        if image_path in self.current_project.image_paths:
-            self.current_image_idx = self.current_project.image_paths.index(image_path)
+        idx = self.current_project.image_paths_index.get(image_path)
+        if idx is not None:
+            self.current_image_idx = idx
             self.show_current_image()
             self.update_nav_buttons()
             # 统一更新进度信息
@@ -1217,12 +1380,13 @@ class YOLOAnnotationTool(QMainWindow):
 
     def on_annotation_updated(self, annotations):
         """标注更新时的回调"""
-        if (not self.current_project or
-                self.current_image_idx < 0 or
-                self.current_image_idx >= len(self.current_project.image_paths)):
+        # 以编辑器实际展示的图片归属本次更新：切换图片时挂起的合并
+        # 信号会在新内容设置前被冲刷，此刻current_image_idx可能已经
+        # 指向新图片，按索引反推路径会把编辑记到错误的图片上
+        image_path = self._editor_image_path
+        if not self.current_project or not image_path:
             return
 
-        image_path = self.current_project.image_paths[self.current_image_idx]
         if image_path in self.current_project.processed_images:
             image, _ = self.current_project.processed_images[image_path]
             self.current_project.processed_images[image_path] = (image, annotations)
@@ -1232,7 +1396,9 @@ class YOLOAnnotationTool(QMainWindow):
             self.update_single_item_in_list(image_path)
             # 更新进度
             self.update_progress()
-            # 不再自动保存项目以避免界面卡顿
+            # 批量自动保存：修改攒够一批才落盘，不会造成界面卡顿
+            self.current_project.mark_dirty()
+            self.current_project.maybe_save()
 
     def export_all_results(self) -> None:
         """导出所有结果到YOLO格式数据集目录结构
@@ -1333,31 +1499,43 @@ class YOLOAnnotationTool(QMainWindow):
                 (test_images, test_img_dir, test_label_dir, "test")
             ]
 
-            for images, img_dir, label_dir, tag in datasets:
-                for i, image_path in enumerate(images):
-                    # 更新状态栏进度
-                    self.statusBar().showMessage(f"正在导出 {tag}: {i+1}/{len(images)}")
-                    QCoreApplication.processEvents()
-                    
-                    # 复制原始图片到对应images目录
-                    img_filename = os.path.basename(image_path)
-                    shutil.copy2(image_path, os.path.join(img_dir, img_filename))
-
-                    # 生成并保存标注文件到对应labels目录
-                    self.export_annotation_file(image_path, label_dir)
-
-            # 导出未标注图片
-            for i, image_path in enumerate(unlabeled_images):
-                # 更新状态栏进度
-                self.statusBar().showMessage(f"正在导出 unlabeled: {i+1}/{len(unlabeled_images)}")
-                QCoreApplication.processEvents()
-                
-                img_filename = os.path.basename(image_path)
-                shutil.copy2(image_path, os.path.join(unlabeled_dir, img_filename))
-
-            # 预先创建类别名称到ID的映射以提高查找性能
+            # 预先创建类别名称到ID的映射，整个导出任务只构建一次
             class_name_to_id = {name: i for i, name in enumerate(self.current_project.class_names)}
 
+            # 预先批量计算所有(源路径, 目标路径)对，把路径字符串操作移出提交循环
+            labeled_jobs: List[Tuple[str, str, str]] = []
+            for images, img_dir, label_dir, tag in datasets:
+                labeled_jobs.extend(
+                    (p, os.path.join(img_dir, os.path.basename(p)), label_dir)
+                    for p in images)
+            unlabeled_jobs = [
+                (p, os.path.join(unlabeled_dir, os.path.basename(p)))
+                for p in unlabeled_images]
+
+            # 使用线程池并行导出：磁盘复制和标注写入都是I/O密集型操作，
+            # 多线程可以重叠多个文件的读写延迟
+            max_workers = min(32, (os.cpu_count() or 4) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = []
+                for image_path, img_dst, label_dir in labeled_jobs:
+                    futures.append(executor.submit(
+                        self._export_labeled_image, image_path, img_dst, label_dir,
+                        class_name_to_id))
+
+                # 导出未标注图片
+                for image_path, img_dst in unlabeled_jobs:
+                    futures.append(executor.submit(link_or_copy, image_path, img_dst))
+
+                total_jobs = len(futures)
+                for done, future in enumerate(as_completed(futures), 1):
+                    # 每完成一批更新一次状态栏，避免过于频繁的界面刷新
+                    if done % 20 == 0 or done == total_jobs:
+                        self.statusBar().showMessage(f"正在导出: {done}/{total_jobs}")
+                        QCoreApplication.processEvents()
+                    exc = future.exception()
+                    if exc is not None:
+                        logger.error(f"导出单个文件时出错: {str(exc)}")
+
             # 添加导出训练集配置文件
             self._export_dataset_config(base_dir, class_name_to_id)
             
@@ -1374,6 +1552,19 @@ class YOLOAnnotationTool(QMainWindow):
             logger.error(f"导出结果时出错: {str(e)}")
             QMessageBox.critical(self, "导出错误", f"导出结果失败: {str(e)}")
 
+    def _export_labeled_image(self, image_path: str, img_dst: str, label_dir: str,
+                              class_name_to_id: Optional[Dict[str, int]] = None) -> None:
+        """导出单张已标注图片：复制原图并生成标注文件
+
+        Args:
+            image_path: 图片文件路径
+            img_dst: 图片目标路径（由调用方预先拼接）
+            label_dir: 标注文件目标目录
+            class_name_to_id: 类别名称到ID的映射（可选，由调用方预先构建）
+        """
+        link_or_copy(image_path, img_dst)
+        self.export_annotation_file(image_path, label_dir, class_name_to_id)
+
     @staticmethod
     def _export_dataset_config(base_dir: str, class_name_to_id: Dict[str, int]) -> None:
         """导出数据集配置文件
@@ -1406,13 +1597,15 @@ class YOLOAnnotationTool(QMainWindow):
         except Exception as e:
             logger.error(f"导出配置文件时出错: {str(e)}")
 
-    def export_annotation_file(self, image_path: str, label_dir: str) -> bool:
+    def export_annotation_file(self, image_path: str, label_dir: str,
+                               class_name_to_id: Optional[Dict[str, int]] = None) -> bool:
         """导出单个图片的YOLO格式标注文件
-        
+
         Args:
             image_path: 图像文件路径
             label_dir: 标注文件保存目录
-            
+            class_name_to_id: 类别名称到ID的映射（可选，未提供时在函数内构建）
+
         Returns:
             bool: 导出成功返回True，失败返回False
         """
@@ -1443,10 +1636,10 @@ class YOLOAnnotationTool(QMainWindow):
             # 如果图像为None，尝试加载它
             if image is None:
                 logger.debug(f"缓存中无图像数据，尝试加载: {image_path}")
-                image = cv2.imread(image_path)
-                # 更新缓存中的图像
+                image = imread_bgr(image_path)
+                # 更新缓存中的图像，经cache_image计入内存预算
                 if image is not None:
-                    self.current_project.processed_images[image_path] = (image, annotations)
+                    self.current_project.cache_image(image_path, image)
                     logger.debug(f"成功加载并更新图像缓存: {image_path}")
 
             # 获取图片尺寸用于坐标归一化
@@ -1471,69 +1664,76 @@ class YOLOAnnotationTool(QMainWindow):
             base_name = os.path.splitext(os.path.basename(image_path))[0]
             output_txt_path = os.path.join(label_dir, f"{base_name}.txt")
 
-            # 创建类别名称到ID的映射以提高查找性能
-            class_name_to_id = {name: i for i, name in enumerate(self.current_project.class_names)}
+            # 未预构建时才创建类别名称到ID的映射
+            if class_name_to_id is None:
+                class_name_to_id = {name: i for i, name in enumerate(self.current_project.class_names)}
+
+            # 预先计算宽高的倒数，循环内用乘法代替除法
+            inv_w = 1.0 / width
+            inv_h = 1.0 / height
 
-            # 写入YOLO格式标注
-            with open(output_txt_path, "w", encoding="utf-8") as f:
-                valid_annotations = 0
-                for annot in annotations:
-                    try:
-                        if "box" not in annot or "class" not in annot:
-                            logger.warning(f"标注数据不完整: {annot}")
-                            continue
-
-                        x1, y1, x2, y2 = annot["box"]
-
-                        # 验证坐标有效性
-                        if x1 < 0 or y1 < 0 or x2 > width or y2 > height:
-                            logger.warning(f"标注坐标超出图像范围: {image_path}, 坐标: {x1}, {y1}, {x2}, {y2}")
-                            # 裁剪坐标到有效范围
-                            x1 = max(0, x1)
-                            y1 = max(0, y1)
-                            x2 = min(width, x2)
-                            y2 = min(height, y2)
-
-                        # 检查边界框是否有效
-                        if x2 <= x1 or y2 <= y1:
-                            logger.warning(f"无效边界框(宽或高为0): {image_path}, 坐标: {x1}, {y1}, {x2}, {y2}")
-                            continue
-
-                        # 转换为YOLO格式：中心点坐标和宽高（归一化）
-                        cx = (x1 + x2) / 2 / width
-                        cy = (y1 + y2) / 2 / height
-                        w = (x2 - x1) / width
-                        h = (y2 - y1) / height
-
-                        # 确保坐标在有效范围内
-                        cx = max(0.0, min(1.0, cx))
-                        cy = max(0.0, min(1.0, cy))
-                        w = max(0.0, min(1.0, w))
-                        h = max(0.0, min(1.0, h))
-
-                        # 获取类别ID
-                        class_name = annot["class"]
-                        if class_name not in class_name_to_id:
-                            logger.error(f"未知类别: {class_name}")
-                            continue
-
-                        class_id = class_name_to_id[class_name]
-
-                        f.write(f"{class_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}\n")
-                        valid_annotations += 1
-                    except Exception as e:
-                        logger.error(f"处理单个标注时出错: {str(e)}")
+            # 先在内存中构建所有标注行，最后一次性写入，
+            # 避免逐框的小块写入带来的缓冲和系统调用开销
+            lines: List[str] = []
+            for annot in annotations:
+                try:
+                    if "box" not in annot or "class" not in annot:
+                        logger.warning(f"标注数据不完整: {annot}")
                         continue
 
-                # 强制刷新文件缓冲区确保数据写入
-                f.flush()
-                os.fsync(f.fileno())
+                    x1, y1, x2, y2 = annot["box"]
+
+                    # 验证坐标有效性
+                    if x1 < 0 or y1 < 0 or x2 > width or y2 > height:
+                        logger.warning(f"标注坐标超出图像范围: {image_path}, 坐标: {x1}, {y1}, {x2}, {y2}")
+                        # 裁剪坐标到有效范围
+                        x1 = max(0, x1)
+                        y1 = max(0, y1)
+                        x2 = min(width, x2)
+                        y2 = min(height, y2)
 
-            if valid_annotations > 0:
-                logger.info(f"成功导出 {valid_annotations} 个标注到: {output_txt_path}")
+                    # 检查边界框是否有效
+                    if x2 <= x1 or y2 <= y1:
+                        logger.warning(f"无效边界框(宽或高为0): {image_path}, 坐标: {x1}, {y1}, {x2}, {y2}")
+                        continue
+
+                    # 转换为YOLO格式：中心点坐标和宽高（归一化）
+                    cx = (x1 + x2) / 2 * inv_w
+                    cy = (y1 + y2) / 2 * inv_h
+                    w = (x2 - x1) * inv_w
+                    h = (y2 - y1) * inv_h
+
+                    # 确保坐标在有效范围内
+                    cx = max(0.0, min(1.0, cx))
+                    cy = max(0.0, min(1.0, cy))
+                    w = max(0.0, min(1.0, w))
+                    h = max(0.0, min(1.0, h))
+
+                    # 获取类别ID
+                    class_name = annot["class"]
+                    if class_name not in class_name_to_id:
+                        logger.error(f"未知类别: {class_name}")
+                        continue
+
+                    class_id = class_name_to_id[class_name]
+
+                    lines.append(f"{class_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}")
+                except Exception as e:
+                    logger.error(f"处理单个标注时出错: {str(e)}")
+                    continue
+
+            if lines:
+                # 一次写入全部标注内容，整个文件只产生一次写系统调用
+                with open(output_txt_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(lines))
+                    f.write("\n")
+                    # 强制刷新文件缓冲区确保数据写入
+                    f.flush()
+                    os.fsync(f.fileno())
+                logger.info(f"成功导出 {len(lines)} 个标注到: {output_txt_path}")
                 return True
             else:
-                # 如果没有有效标注，删除空文件
+                # 没有有效标注时不生成文件，并清理可能存在的旧文件
                 if os.path.exists(output_txt_path):
                     os.remove(output_txt_path)
                 logger.warning(f"无有效标注导出: {image_path}")
@@ -1564,24 +1764,21 @@ class YOLOAnnotationTool(QMainWindow):
                 self.current_project.image_dir):
             return
         try:
-            # 获取当前目录内容
-            current_files = set(os.listdir(self.current_project.image_dir))
+            # 单次scandir同时得到目录内容和图片文件列表
+            current_files = set()
+            image_files = []
+            with os.scandir(self.current_project.image_dir) as it:
+                for entry in it:
+                    current_files.add(entry.name)
+                    if entry.is_file() and entry.name.lower().endswith(_IMAGE_EXTS):
+                        image_files.append(entry.path)
             # 检查是否有变化
             if current_files != self.last_directory_contents:
                 # 目录内容发生变化，重新加载图片列表
                 logger.debug("检测到图片目录内容变化，重新加载图片列表")
 
-                # 获取图片文件扩展名
-                image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
-
-                # 重新扫描目录中的图片文件
-                image_files = [
-                    os.path.join(self.current_project.image_dir, file) for file in current_files
-                    if os.path.splitext(file)[1].lower() in image_extensions
-                ]
-                
                 # 按文件名排序
-                image_files.sort(key=lambda x: os.path.basename(x))
+                image_files.sort(key=os.path.basename)
 
                 # 更新项目中的图片路径
                 self.current_project.image_paths = image_files
@@ -1604,7 +1801,21 @@ class YOLOAnnotationTool(QMainWindow):
         if self.directory_watcher_timer is not None:
             self.directory_watcher_timer.stop()
 
-        # 设置图片编辑器的关闭标志
+        # 停止后台推理线程
+        if self._inference_worker is not None:
+            self._inference_worker.stop()
+            self._inference_worker.wait(5000)
+            self._inference_worker = None
+
+        # 关闭后台解码线程池
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=False, cancel_futures=True)
+            self._decode_pool = None
+            self._pending_decodes.clear()
+
+        # 冲刷编辑器中仍在合并窗口内的标注变更，再设置关闭标志
+        # （closing为True后挂起的信号不再发出，最后一次编辑会丢失）
+        self.image_editor.flush_annotation_update()
         self.image_editor.closing = True
 
         # 检查是否需要保存项目
@@ -1661,30 +1872,46 @@ class YOLOAnnotationTool(QMainWindow):
         if self.model is not None and self.loaded_model_path == self.current_project.model_path:
             return
 
+        # 会话内加载过的模型直接复用，来回切换不再重新解析权重
+        cached = self._model_cache.get(self.current_project.model_path)
+        if cached is not None:
+            logger.info(f"复用缓存的模型: {self.current_project.model_path}")
+            self.model = cached
+            self.loaded_model_path = self.current_project.model_path
+            return
+
         # 设置加载标志
         self.is_model_loading = True
         # 显示加载遮罩
         self.show_loading_overlay("正在加载模型...")
         try:
-            # 释放之前的模型（如果存在）
-            if self.model is not None:
-                logger.info(f"释放之前的模型: {self.loaded_model_path}")
-                # 清理CUDA缓存
-                if torch.cuda.is_available():
-                    torch.cuda.empty_cache()
-                self.model = None
-
             logger.info(f"加载YOLO模型: {self.current_project.model_path}")
             self.statusBar().showMessage("正在加载模型...")
             QCoreApplication.processEvents()  # 确保状态栏更新
 
-            self.model = YOLO(self.current_project.model_path)
-            # 保存已加载模型的路径
+            # 如果旁边存在已导出的TensorRT引擎，优先使用（免去FP32权重推理）
+            model_path = self.current_project.model_path
+            engine_path = os.path.splitext(model_path)[0] + ".engine"
+            if torch.cuda.is_available() and os.path.exists(engine_path):
+                logger.info(f"发现已导出的TensorRT引擎，优先加载: {engine_path}")
+                model_path = engine_path
+
+            self.model = YOLO(model_path)
+            # 保存已加载模型的路径并放入缓存
             self.loaded_model_path = self.current_project.model_path
+            self._model_cache[self.loaded_model_path] = self.model
             # 设置设备优先级: CUDA > MPS > CPU
             device = "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
             self.model.to(device=device)
+            # Volta及以上架构(计算能力>=7.0)具备TensorCore，FP16推理可减半带宽并提升吞吐
+            self._use_half = (device == "cuda" and
+                              torch.cuda.get_device_capability() >= (7, 0))
+            if self._use_half:
+                logger.info("GPU支持TensorCore，启用FP16半精度推理")
             logger.info(f"模型加载成功，使用设备: {device}")
+            # 根据显存情况自动校准批次大小
+            if device == "cuda":
+                self._auto_tune_batch_size()
             self.statusBar().showMessage("模型加载完成")
         except Exception as e:
             logger.error(f"模型加载失败: {str(e)}")
@@ -1697,6 +1924,48 @@ class YOLOAnnotationTool(QMainWindow):
             # 隐藏加载遮罩
             self.hide_loading_overlay()
 
+    def _auto_tune_batch_size(self) -> None:
+        """根据空闲显存自动校准批次大小
+
+        用虚拟图片逐级试探批次大小（1到32），当显存占用超过90%或推理耗时
+        相对上一级出现明显回退时停止，取最后一个安全的批次大小。
+        固定批次在小显存设备上有OOM风险，在大显存设备上又浪费吞吐，
+        一次性校准可以在不同机器上都接近最优。
+        """
+        if self.model is None or not torch.cuda.is_available():
+            return
+
+        # 用模型输入尺寸的虚拟图片做试探，避免依赖真实图片
+        dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+        best_size = 1
+        last_per_image = None
+        try:
+            for bs in (1, 2, 4, 8, 16, 32):
+                start = time.perf_counter()
+                with torch.inference_mode():
+                    self.model([dummy] * bs, verbose=False, batch=bs, half=self._use_half)
+                elapsed = time.perf_counter() - start
+                free, total = torch.cuda.mem_get_info()
+                used_ratio = (total - free) / total
+                per_image = elapsed / bs
+                logger.debug(f"批次试探 bs={bs}: 显存占用{used_ratio:.0%}, 单张耗时{per_image * 1000:.1f}ms")
+                # 显存超过90%阈值，停止增大批次
+                if used_ratio >= 0.9:
+                    break
+                # 单张耗时相对上一级明显回退，说明批次收益已饱和
+                if last_per_image is not None and per_image > last_per_image * 1.1:
+                    break
+                last_per_image = per_image
+                best_size = bs
+            self.batch_size = best_size
+            logger.info(f"批次大小自动校准完成: {self.batch_size}")
+        except Exception as e:
+            # 校准失败不影响正常使用，保持默认批次
+            logger.warning(f"批次大小校准失败，使用默认值 {self.batch_size}: {str(e)}")
+        finally:
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
     def show_loading_overlay(self, message="正在加载..."):
         """显示全屏加载遮罩"""
         if self.loading_overlay is None:
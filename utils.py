@@ -70,9 +70,105 @@ def generate_random_colors(n: int) -> List[Tuple[int, int, int]]:
 
 def ensure_directory(directory: str) -> None:
     """确保目录存在，如果不存在则创建
-    
+
     Args:
         directory: 目录路径
     """
     import os
-    os.makedirs(directory, exist_ok=True)
\ No newline at end of file
+    os.makedirs(directory, exist_ok=True)
+
+
+def imread_bgr(path):
+    """读取图片为BGR数组，兼容非ASCII路径
+
+    cv2.imread在Windows上无法处理包含中文等非ASCII字符的路径，
+    改用np.fromfile读取原始字节再由cv2.imdecode解码，绕过OpenCV
+    自身的路径处理，同时行为与cv2.imread(IMREAD_COLOR)保持一致。
+
+    Args:
+        path: 图片文件路径
+
+    Returns:
+        BGR图像数组，读取或解码失败时返回None
+    """
+    import cv2
+    import numpy as np
+    try:
+        buf = np.fromfile(path, dtype=np.uint8)
+    except OSError:
+        return None
+    if buf.size == 0:
+        return None
+    return cv2.imdecode(buf, cv2.IMREAD_COLOR)
+
+
+def fast_copy(src: str, dst: str) -> None:
+    """快速复制文件，优先使用零拷贝方式
+
+    在支持os.sendfile的平台上直接在内核态传输数据，避免用户态缓冲区的
+    读写循环；失败时回退到shutil.copyfile（Python 3.8+内部也会尝试快速路径）。
+    复制完成后同步文件元数据。
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    import os
+    import shutil
+
+    # 源与目标是同一文件（例如上次导出留下的硬链接）时，
+    # 以写模式打开dst会截断src共享的inode，必须先行跳过
+    try:
+        if os.path.samefile(src, dst):
+            return
+    except OSError:
+        pass
+
+    copied = False
+    if hasattr(os, 'sendfile'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                src_fd = fsrc.fileno()
+                dst_fd = fdst.fileno()
+                size = os.fstat(src_fd).st_size
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(dst_fd, src_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                copied = offset >= size
+        except OSError:
+            copied = False
+
+    if not copied:
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """优先用硬链接导出文件，失败时回退到快速复制
+
+    源文件与目标目录位于同一文件系统时，硬链接只需一次元数据系统调用，
+    不占用额外磁盘空间也不读写文件内容；跨设备或文件系统不支持硬链接
+    时回退到fast_copy。目标已存在时先判断是否就是源的硬链接（重复导出
+    的常见情况），是则直接复用，否则删除旧文件后重试。
+
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径
+    """
+    import os
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        try:
+            if os.path.samefile(src, dst):
+                # 上次导出的硬链接仍然有效，无需任何操作
+                return
+            os.remove(dst)
+            os.link(src, dst)
+        except OSError:
+            fast_copy(src, dst)
+    except OSError:
+        fast_copy(src, dst)
\ No newline at end of file